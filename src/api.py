@@ -1,12 +1,81 @@
 import requests
-from typing import List
+import time
+import tracing
+from typing import Dict, List, Optional
+
+DEFAULT_BASE_URL = "https://www.arathia.net/w/api.php"
 
 
 class WikiAPI:
-    def __init__(self, logging=False):
-        self.base_url = "https://www.arathia.net/w/api.php"
+    # Maximum number of titles per prop=categories query for regular accounts
+    batch_size = 50
+
+    def __init__(
+        self,
+        logging=False,
+        cassette=None,
+        base_url: str = DEFAULT_BASE_URL,
+        maxlag: Optional[int] = None,
+        max_retries: int = 3,
+    ):
+        self.base_url = base_url
         self.ignore_categories = ["Pages with broken file links"]
         self.logging = logging
+        self.cassette = cassette
+        self.maxlag = maxlag
+        self.max_retries = max_retries
+        if cassette is not None and cassette.recording:
+            cassette.base_url = self.base_url
+
+    def _request(self, params: dict) -> dict:
+        """Sends a query to the wiki, or answers it from the cassette when replaying"""
+        if self.maxlag is not None:
+            params = {**params, "maxlag": str(self.maxlag)}
+
+        query = params.get("list") or params.get("prop")
+        if self.cassette is not None and not self.cassette.recording:
+            with tracing.span("replay api.php", "http", query=query):
+                return self.cassette.play(params)
+
+        with tracing.span("GET api.php", "http", query=query):
+            data = self._send(params)
+
+        if self.cassette is not None:
+            self.cassette.record(params, data)
+        return data
+
+    def _send(self, params: dict) -> dict:
+        """Performs the HTTP request, retrying server errors and maxlag rejections"""
+        for attempt in range(self.max_retries + 1):
+            response = requests.get(self.base_url, params=params)
+            retryable = response.status_code >= 500
+            data = None
+            if not retryable:
+                data = response.json()
+                retryable = data.get("error", {}).get("code") == "maxlag"
+
+            if not retryable:
+                return data
+            if attempt == self.max_retries:
+                break
+
+            delay = float(response.headers.get("Retry-After", 2**attempt))
+            if self.logging:
+                print(f"Server busy ({response.status_code}), retrying in {delay}s")
+            time.sleep(delay)
+
+        response.raise_for_status()
+        raise requests.HTTPError(f"Request failed after {self.max_retries} retries: {data['error']['info']}")
+
+    def _query_all(self, params: dict):
+        """Yields every result page of a query, following the API's continuation tokens"""
+        continuation = {}
+        while True:
+            data = self._request({**params, **continuation})
+            yield data
+            if "continue" not in data:
+                break
+            continuation = data["continue"]
 
     def get_category_members(self, category: str) -> tuple[List[str], List[str]]:
         if self.logging:
@@ -20,44 +89,54 @@ class WikiAPI:
             "cmlimit": "500",
         }
 
-        response = requests.get(self.base_url, params=params)
-        data = response.json()
-
         members = []
         subcategories = []
 
-        for page in data["query"]["categorymembers"]:
-            if page["title"] in self.ignore_categories:
-                continue
-            if page["title"].startswith("Category:"):
-                subcategories.append(page["title"].replace("Category:", ""))
-            else:
-                members.append(page["title"])
+        for data in self._query_all(params):
+            for page in data["query"]["categorymembers"]:
+                if page["title"] in self.ignore_categories:
+                    continue
+                if page["title"].startswith("Category:"):
+                    subcategories.append(page["title"].replace("Category:", ""))
+                else:
+                    members.append(page["title"])
 
         return members, subcategories
 
     def get_page_categories(self, page_title: str) -> List[str]:
-        if self.logging:
-            print(f"Fetching categories for page: {page_title}")
+        return self.get_pages_categories([page_title]).get(page_title, [])
 
-        params = {
-            "action": "query",
-            "titles": page_title,
-            "prop": "categories",
-            "format": "json",
-        }
+    def get_pages_categories(self, page_titles: List[str]) -> Dict[str, List[str]]:
+        """
+        Fetches the categories of several pages, `batch_size` titles per request.
+        Returns:
+            Dict[str, List[str]]: Category names keyed by the titles as they were passed in.
+        """
+        result = {title: [] for title in page_titles}
+
+        for start in range(0, len(page_titles), self.batch_size):
+            batch = page_titles[start : start + self.batch_size]
+            if self.logging:
+                print(f"Fetching categories for {len(batch)} pages: {batch[0]}...")
 
-        response = requests.get(self.base_url, params=params)
-        data = response.json()
+            params = {
+                "action": "query",
+                "titles": "|".join(batch),
+                "prop": "categories",
+                "cllimit": "max",
+                "format": "json",
+            }
 
-        pages = data["query"]["pages"]
-        page = next(iter(pages.values()))
+            for data in self._query_all(params):
+                query = data["query"]
+                # Map normalized titles (e.g. underscores) back to the requested ones
+                requested = {entry["to"]: entry["from"] for entry in query.get("normalized", [])}
 
-        if "categories" not in page:
-            return []
+                for page in query["pages"].values():
+                    categories = result.setdefault(requested.get(page["title"], page["title"]), [])
+                    for cat in page.get("categories", []):
+                        name = cat["title"].replace("Category:", "")
+                        if name not in self.ignore_categories:
+                            categories.append(name)
 
-        return [
-            cat["title"].replace("Category:", "")
-            for cat in page["categories"]
-            if cat["title"].replace("Category:", "") not in self.ignore_categories
-        ]
+        return result
@@ -0,0 +1,199 @@
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import requests
+from html_converter import HEAD_PATH
+
+ASSET_DIR = os.path.join(os.path.dirname(__file__), "html", "assets")
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# URL scheme the editor serves bundled assets under, e.g. wikiassets://bundle/3f2a9c1e04b7.css
+ASSET_SCHEME = "wikiassets"
+ASSET_HOST = "bundle"
+
+# Script and link tags may span several lines in head.html
+TAG_PATTERN = re.compile(r"<(?:script|link)\b[^>]*>", re.IGNORECASE)
+URL_ATTRIBUTE_PATTERN = re.compile(r'\b(src|href)\s*=\s*"([^"]*)"', re.IGNORECASE)
+# Subresource integrity and CORS mode only apply to the remote copies
+REMOTE_ONLY_ATTRIBUTE_PATTERN = re.compile(r'\s+(?:integrity|crossorigin)\s*=\s*"[^"]*"', re.IGNORECASE)
+
+CSS_COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_WHITESPACE_PATTERN = re.compile(r"\s+")
+CSS_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,])\s*")
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+CONTENT_TYPES = {"script": "text/javascript", "stylesheet": "text/css"}
+
+
+def find_assets(head_html: str) -> List[Tuple[str, str]]:
+    """Returns the (kind, url) of every remote script and stylesheet in the head, in order."""
+    assets = []
+    for tag in TAG_PATTERN.findall(head_html):
+        kind = asset_kind(tag)
+        if kind is None:
+            continue
+        url = html.unescape(URL_ATTRIBUTE_PATTERN.search(tag).group(2))
+        if url.startswith(("http://", "https://")) and (kind, url) not in assets:
+            assets.append((kind, url))
+    return assets
+
+
+def asset_kind(tag: str) -> Optional[str]:
+    lowered = tag.lower()
+    if not URL_ATTRIBUTE_PATTERN.search(tag):
+        return None
+    if lowered.startswith("<script"):
+        return "script"
+    if re.search(r'\brel\s*=\s*"stylesheet"', lowered):
+        return "stylesheet"
+    return None
+
+
+def minify_css(css: str) -> str:
+    css = CSS_COMMENT_PATTERN.sub("", css)
+    css = CSS_WHITESPACE_PATTERN.sub(" ", css)
+    return CSS_PUNCTUATION_PATTERN.sub(r"\1", css).strip()
+
+
+def absolutize_css_urls(css: str, base_url: str) -> str:
+    """Points relative url(...) references at the original server, since the stylesheet moves."""
+
+    def replace(match):
+        quote, ref = match.groups()
+        if ref.startswith(("data:", "http://", "https://", "#")):
+            return match.group(0)
+        return f"url({quote}{urljoin(base_url, ref)}{quote})"
+
+    return CSS_URL_PATTERN.sub(replace, css)
+
+
+def asset_file_name(kind: str, url: str) -> str:
+    extension = ".js" if kind == "script" else ".css"
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:12] + extension
+
+
+def build_bundle(head_path: str = HEAD_PATH, asset_dir: str = ASSET_DIR, session=None) -> dict:
+    """
+    Downloads the scripts and stylesheets referenced by the preview head into `asset_dir` and
+    writes a manifest mapping each original URL to its local file. Stylesheets are minified and
+    their relative url() references made absolute; scripts are stored as served, since jQuery and
+    ResourceLoader already deliver them minified.
+    Only the assets named in the head are bundled: ResourceLoader modules the startup script
+    requests at runtime and files referenced by the stylesheets' url()s still load from the
+    wiki, so the preview is not fully offline with a bundle either.
+    Returns:
+        dict: The manifest that was written.
+    """
+    session = session or requests.Session()
+    with open(head_path, "r", encoding="utf-8") as f:
+        head_html = f.read()
+
+    os.makedirs(asset_dir, exist_ok=True)
+    assets = {}
+    for kind, url in find_assets(head_html):
+        print(f"Fetching {kind}: {url}")
+        response = session.get(url)
+        response.raise_for_status()
+        text = response.text
+        if kind == "stylesheet":
+            text = minify_css(absolutize_css_urls(text, url))
+
+        data = text.encode("utf-8")
+        file_name = asset_file_name(kind, url)
+        with open(os.path.join(asset_dir, file_name), "wb") as f:
+            f.write(data)
+        assets[url] = {
+            "file": file_name,
+            "content_type": CONTENT_TYPES[kind],
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+
+    manifest = {"version": MANIFEST_VERSION, "assets": assets}
+    with open(os.path.join(asset_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    print(f"Bundled {len(assets)} assets ({sum(a['size'] for a in assets.values()) / 1000:.0f} kB) in {asset_dir}")
+    return manifest
+
+
+class AssetBundle:
+    """
+    The locally built preview assets, held in memory and served under the asset URL scheme.
+    These are the head's own scripts and stylesheets only, see build_bundle for what still loads from the wiki.
+    Attributes:
+        files (Dict[str, Tuple[bytes, str]]): Content and content type of every asset, keyed by file name.
+        urls (Dict[str, str]): Local file name of every bundled remote URL.
+    Example:
+        bundle = AssetBundle.load()
+        head_html = bundle.rewrite_head(head_html) if bundle else head_html
+    """
+
+    def __init__(self, files: Dict[str, Tuple[bytes, str]], urls: Dict[str, str]):
+        self.files = files
+        self.urls = urls
+
+    @classmethod
+    def load(cls, asset_dir: str = ASSET_DIR) -> Optional["AssetBundle"]:
+        """Reads a bundle made by build_bundle, or returns None when there is none"""
+        manifest_path = os.path.join(asset_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION:
+            return None
+
+        files = {}
+        urls = {}
+        for url, asset in manifest["assets"].items():
+            try:
+                with open(os.path.join(asset_dir, asset["file"]), "rb") as f:
+                    files[asset["file"]] = (f.read(), asset["content_type"])
+            except FileNotFoundError:
+                continue
+            urls[url] = asset["file"]
+        return cls(files, urls)
+
+    @staticmethod
+    def asset_url(file_name: str) -> str:
+        return f"{ASSET_SCHEME}://{ASSET_HOST}/{file_name}"
+
+    def get(self, path: str) -> Optional[Tuple[bytes, str]]:
+        """Returns the content and content type of an asset by its URL path"""
+        return self.files.get(path.lstrip("/"))
+
+    def rewrite_head(self, head_html: str) -> str:
+        """Points the head's bundled script and stylesheet tags at the asset scheme"""
+
+        def replace(match):
+            tag = match.group(0)
+            if asset_kind(tag) is None:
+                return tag
+            url_match = URL_ATTRIBUTE_PATTERN.search(tag)
+            file_name = self.urls.get(html.unescape(url_match.group(2)))
+            if file_name is None:
+                return tag
+            tag = tag[: url_match.start(2)] + self.asset_url(file_name) + tag[url_match.end(2) :]
+            return REMOTE_ONLY_ATTRIBUTE_PATTERN.sub("", tag)
+
+        return TAG_PATTERN.sub(replace, head_html)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download the preview head's scripts and stylesheets into a bundle.")
+    parser.add_argument("--head", default=HEAD_PATH, help="Head template to read asset URLs from")
+    parser.add_argument("--output", default=ASSET_DIR, help="Directory to write the bundle to")
+    args = parser.parse_args()
+    build_bundle(args.head, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from api import WikiAPI
+from cassette import Cassette
+from html_converter import (
+    attribute_cache_stats,
+    clear_attribute_cache,
+    clear_inline_cache,
+    inline_cache_stats,
+    wiki_to_html_table,
+)
+import html_converter_reference
+from local_wiki_server import LocalWikiServer, SyntheticWiki
+from wiki_template import CategoryMap, ManualWikiTemplate, WikiTemplate
+
+DEFAULT_SIZES = [250, 1000, 2500]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "baseline.json")
+
+DEFAULT_CONVERTER_MEGABYTES = [1, 4]
+
+
+def time_stage(func: Callable, repeat: int, setup: Callable = None) -> List[float]:
+    """Runs `func` `repeat` times and returns the wall time of each run; `setup` output is passed in untimed"""
+    runs = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def grouped_category_map(subcategories: List[str], group_size: int = 3) -> CategoryMap:
+    """Nests the subcategories in groups so get_mapped_category has to search the hierarchy"""
+    categories = {}
+    for i, subcategory in enumerate(subcategories):
+        categories.setdefault(f"Group {i // group_size}", {})[subcategory] = {}
+    return CategoryMap(categories)
+
+
+def synthetic_manual_categories(item_count: int) -> dict:
+    """Builds editor-shaped list data (categories > subcategories > items) with `item_count` items"""
+    categories = {}
+    category_count = max(1, item_count // 100)
+    for i in range(item_count):
+        category = categories.setdefault(f"Category {i % category_count}", {"__metadata": {"type": "category"}})
+        subcategory = category.setdefault(f"Subcategory {i % 5}", {"__metadata": {"type": "subcategory"}})
+        subcategory[f"Item {i}"] = {
+            "__metadata": {"type": "item"},
+            "description": f"[[Item {i}]] is described here{{{{ts}}}}with a [[Link {i % 97}|label]].",
+        }
+    return categories
+
+
+def benchmark_dataset(name: str, size: int, wiki_api, category: str, repeat: int) -> List[dict]:
+    """Times every pipeline stage against one data source"""
+    timings: Dict[str, List[float]] = {}
+
+    timings["get_category_members"] = time_stage(lambda: wiki_api.get_category_members(category), repeat)
+    members, subcategories = wiki_api.get_category_members(category)
+    category_map = grouped_category_map(subcategories)
+
+    template = WikiTemplate(f"List of {category}", category_map, wiki_api)
+    timings["fetch_member_categories"] = time_stage(
+        lambda: template.fetch_member_categories(members, category), repeat
+    )
+    results = template.fetch_member_categories(members, category)
+
+    timings["get_mapped_category"] = time_stage(
+        lambda fresh: fresh.aggregate_member_categories(members, results),
+        repeat,
+        setup=lambda: WikiTemplate(f"List of {category}", category_map, wiki_api),
+    )
+    template.aggregate_member_categories(members, results)
+    timings["WikiTemplate.build"] = time_stage(template.build, repeat)
+
+    manual_categories = synthetic_manual_categories(size)
+    # A fresh template per run, as a built template keeps its depth and leaf counts
+    timings["ManualWikiTemplate.build"] = time_stage(
+        lambda fresh: fresh.build(),
+        repeat,
+        setup=lambda: ManualWikiTemplate(f"List of {category}", manual_categories),
+    )
+    manual_wiki_text = ManualWikiTemplate(f"List of {category}", manual_categories).build()
+    timings["wiki_to_html_table"] = time_stage(lambda: wiki_to_html_table(manual_wiki_text), repeat)
+
+    return [
+        {
+            "dataset": name,
+            "size": size,
+            "stage": stage,
+            "median": statistics.median(runs),
+            "min": min(runs),
+            "runs": runs,
+        }
+        for stage, runs in timings.items()
+    ]
+
+
+def run_synthetic(sizes: List[int], repeat: int) -> List[dict]:
+    results = []
+    for size in sizes:
+        server = LocalWikiServer(wiki=SyntheticWiki(size))
+        server.start_in_thread()
+        try:
+            print(f"Benchmarking synthetic wiki with {size} pages...")
+            results += benchmark_dataset(f"synthetic-{size}", size, WikiAPI(base_url=server.base_url), "Characters", repeat)
+        finally:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+def synthetic_wiki_table(megabytes: float) -> str:
+    """Returns a manual list table of roughly the given size, in the shape the editor produces"""
+    block = ManualWikiTemplate("List of Items", synthetic_manual_categories(500)).build()
+    header, _, body = block.partition("\n|-\n")
+    body = body[: -len("\n|}")]
+    copies = max(1, int(megabytes * 1_000_000 / len(body)))
+    return header + "\n|-\n" + "\n|-\n".join([body] * copies) + "\n|}"
+
+
+def run_converter(megabytes: List[float], repeat: int) -> List[dict]:
+    """Times wiki_to_html_table, with and without inline rendering, against the original converter on large tables"""
+    results = []
+    for size in megabytes:
+        wiki_text = synthetic_wiki_table(size)
+        clear_attribute_cache()
+        clear_inline_cache()
+        print(f"Benchmarking converter on a {len(wiki_text) / 1_000_000:.1f} MB table...")
+        timings = {
+            "wiki_to_html_table (reference)": time_stage(
+                lambda: html_converter_reference.wiki_to_html_table(wiki_text), repeat
+            ),
+            "wiki_to_html_table": time_stage(lambda: wiki_to_html_table(wiki_text, render_inline=False), repeat),
+            "wiki_to_html_table (inline)": time_stage(lambda: wiki_to_html_table(wiki_text), repeat),
+        }
+        for stage, runs in timings.items():
+            results.append(
+                {
+                    "dataset": f"converter-{size}MB",
+                    "size": len(wiki_text),
+                    "stage": stage,
+                    "median": statistics.median(runs),
+                    "min": min(runs),
+                    "runs": runs,
+                }
+            )
+        speedup = statistics.median(timings["wiki_to_html_table (reference)"]) / statistics.median(
+            timings["wiki_to_html_table"]
+        )
+        print(
+            f"  {speedup:.1f}x faster than the reference converter, cache hit rates: "
+            f"attributes {attribute_cache_stats()['hit_rate']:.1%}, inline markup {inline_cache_stats()['hit_rate']:.1%}"
+        )
+    return results
+
+
+def run_recorded(path: str, category: str, repeat: int) -> List[dict]:
+    cassette = Cassette(path, "replay")
+    wiki_api = WikiAPI(cassette=cassette)
+    members, _ = wiki_api.get_category_members(category)
+    print(f"Benchmarking recording {path} ({len(members)} members of {category})...")
+    name = f"recorded-{os.path.basename(path).split('.')[0]}"
+    return benchmark_dataset(name, len(members), wiki_api, category, repeat)
+
+
+def compare_to_baseline(
+    results: List[dict], baseline: List[dict], tolerance: float
+) -> Tuple[List[Tuple[Optional[float], Optional[float]]], List[dict]]:
+    """
+    Compares the results with the baseline, leaving both unchanged so they can be saved as they are.
+    Returns:
+        Tuple[List[Tuple[Optional[float], Optional[float]]], List[dict]]: The baseline median of every
+        result and its ratio to it, None for stages the baseline lacks, and the results whose median is
+        slower than the baseline by more than `tolerance`.
+    """
+    baseline_medians = {(entry["dataset"], entry["stage"]): entry["median"] for entry in baseline}
+    comparisons = []
+    regressions = []
+    for result in results:
+        previous = baseline_medians.get((result["dataset"], result["stage"]))
+        ratio = result["median"] / previous if previous else None
+        comparisons.append((previous, ratio))
+        if ratio is not None and ratio > 1 + tolerance:
+            regressions.append(result)
+    return comparisons, regressions
+
+
+def print_results(
+    results: List[dict], comparisons: List[Tuple[Optional[float], Optional[float]]], regressions: List[dict]
+):
+    print(f"\n{'Dataset':<22} {'Stage':<32} {'Median':>10} {'Baseline':>10} {'Ratio':>7}")
+    for result, (previous, ratio) in zip(results, comparisons):
+        baseline = f"{previous * 1000:8.2f}ms" if previous else f"{'-':>10}"
+        ratio = f"{ratio:6.2f}x" if ratio else f"{'-':>7}"
+        flag = "  REGRESSION" if result in regressions else ""
+        print(
+            f"{result['dataset']:<22} {result['stage']:<32} {result['median'] * 1000:8.2f}ms {baseline} {ratio}{flag}"
+        )
+
+
+def load_results(path: str) -> Optional[List[dict]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def save_results(path: str, results: List[dict]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    data = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the list generation pipeline offline.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Synthetic wiki sizes")
+    parser.add_argument(
+        "--converter-sizes",
+        default=",".join(map(str, DEFAULT_CONVERTER_MEGABYTES)),
+        help="Table sizes in MB for the converter comparison",
+    )
+    parser.add_argument("--cassette", action="append", default=[], help="Also benchmark a recorded cassette")
+    parser.add_argument("--category", default="Characters", help="Root category for recorded cassettes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the median is reported")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before flagging")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    # Without a baseline no regression could ever be reported, so a missing one is an error
+    baseline = load_results(args.baseline)
+    if baseline is None and not args.save_baseline:
+        parser.error(f"no baseline at {args.baseline}; create one with --save-baseline")
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = run_synthetic(sizes, args.repeat)
+    results += run_converter([float(size) for size in args.converter_sizes.split(",") if size], args.repeat)
+    for path in args.cassette:
+        results += run_recorded(path, args.category, args.repeat)
+
+    if baseline:
+        comparisons, regressions = compare_to_baseline(results, baseline, args.tolerance)
+    else:
+        comparisons, regressions = [(None, None)] * len(results), []
+    print_results(results, comparisons, regressions)
+
+    save_results(args.output, results)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        save_results(args.baseline, results)
+        print(f"Baseline updated at {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} stage(s) regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
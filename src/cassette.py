@@ -0,0 +1,121 @@
+import gzip
+import json
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+CASSETTE_VERSION = 1
+
+
+def request_key(params: dict) -> str:
+    """Returns a stable key for a set of request parameters, independent of their order."""
+    return json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+class Cassette:
+    """
+    Records WikiAPI traffic to a compressed file and plays it back later.
+    In "record" mode every request made through WikiAPI is sent to the wiki as usual and the
+    response is stored. In "replay" mode responses are served from the file instead, so builds
+    can be repeated offline against the same data. Repeated requests are replayed in the order
+    they were recorded; once exhausted the last response is reused.
+    Attributes:
+        path (str): Location of the cassette file (gzip compressed JSON).
+        mode (str): Either "record" or "replay".
+        latency (float): Seconds added to every replayed response.
+        jitter (float): Maximum random deviation from `latency`, in seconds.
+    Example:
+        with Cassette("characters.cassette.gz", "record") as cassette:
+            CharacterListBuilder(WikiAPI(cassette=cassette)).build()
+
+        cassette = Cassette("characters.cassette.gz", "replay", latency=0.05, jitter=0.02)
+        CharacterListBuilder(WikiAPI(cassette=cassette)).build()
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: Optional[int] = 0,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.base_url = None
+        self.interactions: Dict[str, List[dict]] = {}
+        self._play_counts: Dict[str, int] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        if mode == "replay":
+            self.load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def __len__(self) -> int:
+        return sum(len(responses) for responses in self.interactions.values())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.recording:
+            self.save()
+
+    def record(self, params: dict, response: dict):
+        """Stores the response for a request"""
+        with self._lock:
+            self.interactions.setdefault(request_key(params), []).append(response)
+
+    def play(self, params: dict) -> dict:
+        """Returns the recorded response for a request, after the configured simulated latency"""
+        key = request_key(params)
+        with self._lock:
+            responses = self.interactions.get(key)
+            if not responses:
+                raise LookupError(f"No recorded response for request: {key}")
+            index = self._play_counts.get(key, 0)
+            self._play_counts[key] = index + 1
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+
+        if delay > 0:
+            time.sleep(delay)
+        return responses[min(index, len(responses) - 1)]
+
+    def rewind(self):
+        """Starts replaying repeated requests from their first recording again"""
+        with self._lock:
+            self._play_counts.clear()
+
+    def save(self):
+        data = {
+            "version": CASSETTE_VERSION,
+            "base_url": self.base_url,
+            "interactions": [
+                {"request": json.loads(key), "responses": responses} for key, responses in self.interactions.items()
+            ],
+        }
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {data.get('version')}")
+
+        self.base_url = data.get("base_url")
+        self.interactions = {
+            request_key(interaction["request"]): interaction["responses"] for interaction in data["interactions"]
+        }
+        self._play_counts.clear()
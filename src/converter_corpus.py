@@ -0,0 +1,283 @@
+import argparse
+import io
+import math
+import os
+import random
+import sys
+import time
+from html.parser import HTMLParser
+from typing import Callable, Dict, List
+
+import html_converter_reference
+from html_converter import (
+    STRUCTURE_LINE_PATTERN,
+    clear_attribute_cache,
+    clear_inline_cache,
+    parse_wiki_attributes,
+    stream_wiki_to_html,
+    wiki_to_html_blocks,
+    wiki_to_html_table,
+)
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "converter_corpus")
+
+# Growth exponent of the run time over the input size above which an input counts as super-linear
+DEFAULT_MAX_EXPONENT = 1.3
+LINEARITY_SCALE = 8
+
+# Pieces random tables are put together from: structure markup, text, attributes and inline markup
+FUZZ_TOKENS = (
+    ["{|", "|}", "|-", "|", "||", "!", "!!"]
+    + ["\n", "\n", "\n", " ", "\t", "\r", "a", "Item", "　"]
+    + ['class="x"', "=", '"', "rowspan=2", 'colspan="3 "', "x=y", "style='a'"]
+    + ["[[A]]", "[[A|B]]", "{{ts}}", "''", "'''", "[[", "]]", "{{", "}}"]
+)
+
+
+def pathological_inputs() -> Dict[str, Callable[[int], str]]:
+    """Generators of worst-case inputs, each called with a size roughly in characters."""
+
+    def table(body):
+        return '{| class="wikitable"\n' + body + "\n|}"
+
+    return {
+        "long line": lambda n: table("| " + "word " * (n // 5)),
+        "many || cells": lambda n: table("|" + "||".join(["a"] * (n // 3))),
+        "many !! headers": lambda n: table("!" + "!!".join(["h"] * (n // 3))),
+        "many rows": lambda n: table("\n".join(["|-\n| cell"] * (n // 12))),
+        "unterminated tables": lambda n: "{|\n| a\n" * (n // 8),
+        "unclosed nesting": lambda n: "{|\n|-\n| a\n" * (n // 12),
+        "stray table ends": lambda n: "|}\n" * (n // 3),
+        "rowspan cells": lambda n: table("\n".join(['|-\n|rowspan="3" class="c"|x'] * (n // 30))),
+        "attribute equals run": lambda n: table("|" + "a=" * (n // 2) + "|x"),
+        "attribute unterminated quote": lambda n: table('|a="' + "b " * (n // 2) + "|x"),
+        "attribute word run": lambda n: table("|" + "a" * n + "=b|x"),
+        "attribute dash run": lambda n: table("|" + "-" * n + "=|x"),
+        "unclosed links": lambda n: table("| " + "[[a " * (n // 4)),
+        "unclosed quotes": lambda n: table("| '''" + "''a " * (n // 4)),
+        "nested links": lambda n: table("| " + "[[" * (n // 4) + "]]" * (n // 4)),
+        "many templates": lambda n: table("| " + "{{ts}}" * (n // 6)),
+    }
+
+
+def attribute_inputs() -> Dict[str, Callable[[int], str]]:
+    """Attribute strings that could make the attribute pattern backtrack."""
+    return {
+        "equals run": lambda n: "a=" * (n // 2),
+        "unterminated quote": lambda n: 'a="' + "b " * (n // 2),
+        "word run": lambda n: "a" * n + "=",
+        "spaces before value": lambda n: "a =" + " " * n,
+        "many pairs": lambda n: 'k="v" ' * (n // 6),
+        "unquoted values": lambda n: "k=v" * (n // 3),
+        "dashes": lambda n: "-" * n + "=x",
+    }
+
+
+def random_table(rnd: random.Random, max_tokens: int = 60) -> str:
+    return "".join(rnd.choice(FUZZ_TOKENS) for _ in range(rnd.randint(0, max_tokens)))
+
+
+def comparable_to_reference(text: str) -> bool:
+    """
+    Whether the reference converter is expected to agree: it neither knows that pipes inside
+    links and templates belong to the content, nor supports nested tables.
+    """
+    if "[[" in text or "{{" in text:
+        return False
+    in_table = False
+    for match in STRUCTURE_LINE_PATTERN.finditer(text):
+        if match.lastgroup == "table":
+            if in_table:
+                return False
+            in_table = True
+        elif match.lastgroup == "end":
+            in_table = False
+    return True
+
+
+def well_formed(text: str) -> bool:
+    """Whether every structure line of the input is inside a table that is opened before it"""
+    depth = 0
+    for match in STRUCTURE_LINE_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == "table":
+            depth += 1
+        elif kind == "end":
+            if not depth:
+                return False
+            depth -= 1
+        elif not depth:
+            return False
+    return True
+
+
+class _TagBalanceChecker(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.open_tags = []
+        self.problem = None
+
+    def handle_starttag(self, tag, attrs):
+        self.open_tags.append(tag)
+
+    def handle_endtag(self, tag):
+        if self.problem is None and (not self.open_tags or self.open_tags.pop() != tag):
+            self.problem = f"unexpected </{tag}>"
+
+
+def check_conversion(text: str) -> List[str]:
+    """Converts `text` every available way and returns a description of each disagreement"""
+    problems = []
+    html = wiki_to_html_table(text)
+
+    chunks = []
+    stream_wiki_to_html(io.StringIO(text), chunks.append)
+    if "".join(chunks) != html:
+        problems.append("stream_wiki_to_html differs from wiki_to_html_table")
+
+    if wiki_to_html_blocks(text, rows_per_block=2).to_html() != html:
+        problems.append("wiki_to_html_blocks differs from wiki_to_html_table")
+
+    if comparable_to_reference(text):
+        if wiki_to_html_table(text, render_inline=False) != html_converter_reference.wiki_to_html_table(text):
+            problems.append("wiki_to_html_table differs from the reference converter")
+
+    if text and well_formed(text):
+        checker = _TagBalanceChecker()
+        checker.feed(html)
+        # Cell contents may hold any text, so only table structure tags are checked
+        if checker.problem and checker.problem.strip("</>") in ("table", "tbody", "tr", "td", "th", "div"):
+            problems.append(f"unbalanced HTML: {checker.problem}")
+
+    return problems
+
+
+def check_attributes(attr_str: str) -> List[str]:
+    if parse_wiki_attributes(attr_str) != html_converter_reference.parse_wiki_attributes(attr_str):
+        return ["parse_wiki_attributes differs from the reference converter"]
+    return []
+
+
+def load_corpus(corpus_dir: str = CORPUS_DIR) -> Dict[str, str]:
+    """Returns the wikitext of every .wiki file in the corpus directory, keyed by file name"""
+    corpus = {}
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.endswith(".wiki"):
+            with open(os.path.join(corpus_dir, name), "r", encoding="utf-8") as f:
+                corpus[name] = f.read()
+    return corpus
+
+
+def check_corpus(corpus_dir: str = CORPUS_DIR, update: bool = False) -> List[str]:
+    """
+    Checks every corpus file against its expected .html output and the differential checks.
+    With `update`, the expected outputs are rewritten from the current converter instead.
+    """
+    failures = []
+    for name, text in load_corpus(corpus_dir).items():
+        expected_path = os.path.join(corpus_dir, name[: -len(".wiki")] + ".html")
+        html = wiki_to_html_table(text)
+        if update:
+            with open(expected_path, "w", encoding="utf-8", newline="\n") as f:
+                f.write(html)
+        elif not os.path.exists(expected_path):
+            failures.append(f"{name}: no expected output, run with --update")
+        else:
+            with open(expected_path, "r", encoding="utf-8", newline="") as f:
+                if f.read() != html:
+                    failures.append(f"{name}: output differs from {os.path.basename(expected_path)}")
+        failures += [f"{name}: {problem}" for problem in check_conversion(text)]
+    return failures
+
+
+def fuzz(count: int, seed: int = 0) -> List[str]:
+    """Runs the differential checks on `count` random tables and attribute strings"""
+    rnd = random.Random(seed)
+    failures = []
+    for _ in range(count):
+        text = random_table(rnd)
+        failures += [f"{text!r}: {problem}" for problem in check_conversion(text)]
+        attr_str = random_table(rnd, 20).replace("\n", " ")
+        failures += [f"{attr_str!r}: {problem}" for problem in check_attributes(attr_str)]
+        if len(failures) >= 20:
+            break
+    return failures
+
+
+def _time_min(func: Callable, arg, repeat: int) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        # Caches would hide the cost of repeated runs
+        clear_attribute_cache()
+        clear_inline_cache()
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_linearity(size: int = 20_000, repeat: int = 3, max_exponent: float = DEFAULT_MAX_EXPONENT) -> List[dict]:
+    """
+    Times every pathological input at `size` and LINEARITY_SCALE times `size` and estimates how
+    the run time grows with the input: an exponent of 1 is linear, 2 quadratic.
+    """
+    cases = [(f"wiki_to_html_table: {name}", wiki_to_html_table, make) for name, make in pathological_inputs().items()]
+    cases += [
+        (f"parse_wiki_attributes: {name}", parse_wiki_attributes, make) for name, make in attribute_inputs().items()
+    ]
+
+    results = []
+    for name, func, make in cases:
+        small = _time_min(func, make(size), repeat)
+        large = _time_min(func, make(size * LINEARITY_SCALE), repeat)
+        exponent = math.log(max(large, 1e-9) / max(small, 1e-9), LINEARITY_SCALE)
+        results.append(
+            {"case": name, "small": small, "large": large, "exponent": exponent, "ok": exponent <= max_exponent}
+        )
+    return results
+
+
+def print_linearity(results: List[dict]):
+    print(f"\n{'Case':<58} {'Small':>10} {'Large':>10} {'Exponent':>9}")
+    for result in results:
+        flag = "" if result["ok"] else "  SUPER-LINEAR"
+        print(
+            f"{result['case']:<58} {result['small'] * 1000:8.2f}ms {result['large'] * 1000:8.2f}ms "
+            f"{result['exponent']:9.2f}{flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the wikitext converter against its corpus, random inputs and worst-case timings."
+    )
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="Directory of .wiki inputs and expected .html outputs")
+    parser.add_argument("--update", action="store_true", help="Rewrite the expected outputs of the corpus")
+    parser.add_argument("--fuzz", type=int, default=20_000, help="Number of random inputs to check")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random inputs")
+    parser.add_argument("--size", type=int, default=20_000, help="Base size of the worst-case inputs")
+    parser.add_argument("--max-exponent", type=float, default=DEFAULT_MAX_EXPONENT, help="Allowed growth exponent")
+    parser.add_argument("--skip-timing", action="store_true", help="Only run the correctness checks")
+    args = parser.parse_args()
+
+    failures = check_corpus(args.corpus, args.update)
+    print(f"Checked {len(load_corpus(args.corpus))} corpus files")
+    failures += fuzz(args.fuzz, args.seed)
+    print(f"Checked {args.fuzz} random inputs (seed {args.seed})")
+
+    slow = []
+    if not args.skip_timing:
+        results = check_linearity(args.size, max_exponent=args.max_exponent)
+        print_linearity(results)
+        slow = [result for result in results if not result["ok"]]
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures or slow:
+        print(f"\n{len(failures)} correctness failure(s), {len(slow)} super-linear case(s)")
+        sys.exit(1)
+    print("\nAll checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import bz2
+import gzip
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, IO, List, Tuple
+
+# Matches [[Category:Name]] and [[Category:Name|sort key]] membership links.
+# Links starting with a colon ([[:Category:Name]]) are plain links and are skipped.
+CATEGORY_LINK_PATTERN = re.compile(r"\[\[\s*[Cc]ategory\s*:\s*([^\]|]+?)\s*(?:\|[^\]]*)?\]\]")
+
+# Markup whose contents never produce category memberships
+IGNORED_MARKUP_PATTERN = re.compile(r"<!--.*?-->|<nowiki>.*?</nowiki>", re.DOTALL | re.IGNORECASE)
+
+
+def normalize_title(title: str) -> str:
+    """Normalizes a page or category name the way MediaWiki does (underscores, spacing, first letter)."""
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+
+def extract_categories(wikitext: str) -> List[str]:
+    """Returns the categories a page's wikitext links to, in order of first appearance."""
+    if not wikitext or "ategory" not in wikitext:
+        return []
+
+    wikitext = IGNORED_MARKUP_PATTERN.sub("", wikitext)
+    categories = []
+    for match in CATEGORY_LINK_PATTERN.finditer(wikitext):
+        category = normalize_title(match.group(1))
+        if category and category not in categories:
+            categories.append(category)
+    return categories
+
+
+def open_dump(path: str) -> IO[bytes]:
+    """Opens a plain, gzip or bzip2 compressed dump file, detected by its magic bytes."""
+    with open(path, "rb") as f:
+        magic = f.read(3)
+
+    if magic[:2] == b"\x1f\x8b":
+        return gzip.open(path, "rb")
+    if magic == b"BZh":
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def _local_name(tag: str) -> str:
+    """Strips the export schema namespace, which changes between dump versions."""
+    return tag.rsplit("}", 1)[-1]
+
+
+class DumpCategoryIndex:
+    """
+    An offline page/category index built from a MediaWiki `pages-articles` XML dump.
+    The dump is read with an incremental parser, so memory use depends on the size of the
+    index rather than the size of the dump. Only explicit [[Category:...]] links in the page
+    wikitext are seen; categories added through templates are not expanded.
+    The index exposes the same `get_category_members` and `get_page_categories` methods as
+    WikiAPI and can be passed to WikiTemplate in its place.
+    Attributes:
+        page_categories (Dict[str, List[str]]): Categories of every page, keyed by page title.
+        category_members (Dict[str, List[str]]): Page titles in every category, keyed by category name.
+    Example:
+        index = DumpCategoryIndex.from_dump("arathia-pages-articles.xml.bz2")
+        builder = CharacterListBuilder(wiki_api=index)
+    """
+
+    def __init__(self, logging=False):
+        self.ignore_categories = ["Pages with broken file links"]
+        self.logging = logging
+        self.page_categories: Dict[str, List[str]] = {}
+        self.category_members: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_dump(cls, path: str, logging=False) -> "DumpCategoryIndex":
+        index = cls(logging)
+        index.load(path)
+        return index
+
+    def add_page(self, title: str, wikitext: str):
+        """Adds a single page and its category links to the index"""
+        categories = [cat for cat in extract_categories(wikitext) if cat not in self.ignore_categories]
+        self.page_categories[title] = categories
+        for category in categories:
+            self.category_members.setdefault(category, []).append(title)
+
+    def load(self, path: str) -> int:
+        """
+        Streams all pages of a dump into the index.
+        Args:
+            path (str): Path to the XML dump, optionally compressed with gzip or bzip2.
+        Returns:
+            int: The number of pages read.
+        """
+        if self.logging:
+            print(f"Reading dump: {path}")
+
+        count = 0
+        title = None
+        text = ""
+        root = None
+
+        with open_dump(path) as f:
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if root is None:
+                    root = elem
+                if event != "end":
+                    continue
+
+                name = _local_name(elem.tag)
+                if name == "title":
+                    title = elem.text or ""
+                elif name == "text":
+                    text = elem.text or ""
+                elif name == "page":
+                    if title:
+                        self.add_page(title, text)
+                        count += 1
+                    title = None
+                    text = ""
+                    # Drop the finished page so the tree never grows past one page
+                    root.clear()
+
+        # Category listings come back sorted from the API as well
+        for members in self.category_members.values():
+            members.sort()
+
+        if self.logging:
+            print(f"Indexed {count} pages in {len(self.category_members)} categories")
+        return count
+
+    def get_category_members(self, category: str) -> Tuple[List[str], List[str]]:
+        if self.logging:
+            print(f"Looking up members of category: {category}")
+
+        members = []
+        subcategories = []
+
+        for title in self.category_members.get(normalize_title(category), []):
+            if title in self.ignore_categories:
+                continue
+            if title.startswith("Category:"):
+                subcategories.append(title.replace("Category:", ""))
+            else:
+                members.append(title)
+
+        return members, subcategories
+
+    def get_page_categories(self, page_title: str) -> List[str]:
+        if self.logging:
+            print(f"Looking up categories for page: {page_title}")
+
+        return list(self.page_categories.get(page_title, []))
+
+    def get_pages_categories(self, page_titles: List[str]) -> Dict[str, List[str]]:
+        return {title: self.get_page_categories(title) for title in page_titles}
@@ -0,0 +1,240 @@
+// Preview shell script. The editor loads the page once and then calls
+// patchPreview(tableHtml) through runJavaScript with every newly rendered table.
+(function () {
+    var root = document.getElementById("preview-root");
+    // Opening tag and row markup of the table currently shown, as rendered by the converter.
+    // Rows are compared against this rather than the live DOM, which page scripts modify.
+    var shown = null;
+    // State of the virtualized table shown by showVirtualPreview, if any
+    var virtual = null;
+    var averageRowHeight = 24;
+
+    function parse(html) {
+        var template = document.createElement("template");
+        template.innerHTML = html;
+        return template.content;
+    }
+
+    function mainTable(node) {
+        var tables = node.querySelectorAll(".citizen-table-wrapper > table");
+        return tables.length === 1 && tables[0].tBodies.length === 1 ? tables[0] : null;
+    }
+
+    function describe(table) {
+        return {
+            tag: table.cloneNode(false).outerHTML,
+            rows: Array.prototype.map.call(table.tBodies[0].rows, function (row) {
+                return row.outerHTML;
+            }),
+        };
+    }
+
+    // Lets MediaWiki's page scripts (mw-collapsible and friends) process new content
+    function enhance(content) {
+        if (window.mw && mw.hook && window.jQuery) {
+            mw.hook("wikipage.content").fire(jQuery(content));
+        }
+    }
+
+    function replaceAll(fragment, table) {
+        root.replaceChildren(fragment);
+        virtual = null;
+        shown = table ? describe(table) : null;
+        enhance(root);
+        return -1;
+    }
+
+    // Returns the number of rows that changed, or -1 when the whole table was replaced
+    window.patchPreview = function (html) {
+        var fragment = parse(html);
+        var table = mainTable(fragment);
+        var next = table && describe(table);
+        var live = shown && mainTable(root);
+
+        // The first row holds the collapse toggle, so changes to it or to the table itself
+        // need a fresh table that the page scripts can set up again
+        if (!live || !next || shown.tag !== next.tag || shown.rows[0] !== next.rows[0]) {
+            return replaceAll(fragment, table);
+        }
+
+        var body = live.tBodies[0];
+        var newRows = Array.prototype.slice.call(table.tBodies[0].rows);
+        var hidden = live.classList.contains("mw-collapsed");
+        var common = Math.min(shown.rows.length, next.rows.length);
+        var changed = 0;
+
+        function place(row) {
+            if (hidden) {
+                row.style.display = "none";
+            }
+            changed++;
+            return row;
+        }
+
+        for (var i = 1; i < common; i++) {
+            if (shown.rows[i] !== next.rows[i]) {
+                body.rows[i].replaceWith(place(newRows[i]));
+            }
+        }
+        for (var j = common; j < newRows.length; j++) {
+            body.appendChild(place(newRows[j]));
+        }
+        while (body.rows.length > newRows.length) {
+            body.deleteRow(-1);
+            changed++;
+        }
+
+        shown = next;
+        return changed;
+    };
+
+    // Virtualized tables: only the row blocks near the viewport are in the DOM, every other block
+    // is a single spacer row of the block's measured or estimated height
+
+    function parseRows(html) {
+        var template = document.createElement("template");
+        template.innerHTML = "<table><tbody>" + html + "</tbody></table>";
+        return Array.prototype.slice.call(template.content.querySelector("tbody").rows);
+    }
+
+    function spacerRow(height) {
+        var row = document.createElement("tr");
+        row.className = "virtual-spacer";
+        var cell = row.insertCell();
+        cell.colSpan = 1000;
+        cell.style.cssText = "height:" + height + "px;padding:0;border:0";
+        return row;
+    }
+
+    function blockHeight(rows) {
+        var first = rows[0].getBoundingClientRect();
+        var last = rows[rows.length - 1].getBoundingClientRect();
+        return last.bottom - first.top;
+    }
+
+    function renderVisibleBlocks() {
+        var state = virtual;
+        if (!state) {
+            return;
+        }
+        state.scheduled = false;
+
+        var top = state.body.getBoundingClientRect().top;
+        var margin = window.innerHeight;
+        var offset = 0;
+        var changed = false;
+
+        for (var i = 0; i < state.blocks.length; i++) {
+            var block = state.blocks[i];
+            // The first block holds the header row with the collapse toggle, so it always stays
+            var blockTop = top + offset;
+            var visible = i === 0 || (blockTop + block.height > -margin && blockTop < window.innerHeight + margin);
+            offset += block.height;
+            if (visible === !!block.rows) {
+                continue;
+            }
+
+            // Rows added to a collapsed table start out hidden like the rows already there
+            var hidden = state.table.classList.contains("mw-collapsed");
+            if (visible) {
+                block.rows = parseRows(block.html);
+                block.rows.forEach(function (row) {
+                    if (hidden) {
+                        row.style.display = "none";
+                    }
+                    state.body.insertBefore(row, block.spacer);
+                });
+                block.spacer.remove();
+            } else {
+                block.rows[0].before(block.spacer);
+                block.spacer.style.display = hidden ? "none" : "";
+                block.spacer.firstChild.style.height = block.height + "px";
+                block.rows.forEach(function (row) {
+                    row.remove();
+                });
+                block.rows = null;
+            }
+            changed = true;
+        }
+
+        if (!changed) {
+            return;
+        }
+        // Replace estimates with real heights and refine the estimate for blocks not yet seen
+        var measuredHeight = 0;
+        var measuredRows = 0;
+        state.blocks.forEach(function (block) {
+            if (block.rows && block.rows[0].style.display !== "none") {
+                block.height = blockHeight(block.rows);
+                block.measured = true;
+                measuredHeight += block.height;
+                measuredRows += block.rowCount;
+            }
+        });
+        if (measuredRows) {
+            averageRowHeight = measuredHeight / measuredRows;
+        }
+        state.blocks.forEach(function (block) {
+            if (!block.rows && !block.measured) {
+                block.height = block.rowCount * averageRowHeight;
+                block.spacer.firstChild.style.height = block.height + "px";
+            }
+        });
+    }
+
+    function scheduleRender() {
+        if (virtual && !virtual.scheduled) {
+            virtual.scheduled = true;
+            window.requestAnimationFrame(renderVisibleBlocks);
+        }
+    }
+
+    // Shows a table split into row blocks ({head, blocks, rows, tail}) and renders only the
+    // blocks in and around the viewport, keeping the scroll height through spacer rows
+    window.showVirtualPreview = function (data) {
+        root.replaceChildren(parse(data.head + data.tail));
+        shown = null;
+
+        var table = mainTable(root);
+        if (!table) {
+            virtual = null;
+            enhance(root);
+            return;
+        }
+
+        var body = table.tBodies[0];
+        virtual = {
+            table: table,
+            body: body,
+            scheduled: false,
+            blocks: data.blocks.map(function (html, i) {
+                var block = { html: html, rowCount: data.rows[i], rows: null, measured: false };
+                block.height = block.rowCount * averageRowHeight;
+                block.spacer = spacerRow(block.height);
+                body.appendChild(block.spacer);
+                return block;
+            }),
+        };
+        renderVisibleBlocks();
+        enhance(root);
+    };
+
+    window.addEventListener("scroll", scheduleRender, { passive: true });
+    window.addEventListener("resize", scheduleRender);
+    // Collapsing or expanding the table changes which blocks are in view
+    document.addEventListener("click", function (event) {
+        if (virtual && event.target.closest && event.target.closest(".mw-collapsible-toggle")) {
+            window.setTimeout(scheduleRender, 0);
+        }
+    });
+
+    // Bound once on the container so rows added by later patches get the hover effect too
+    if (window.jQuery) {
+        jQuery(root).on("mouseenter mouseleave", ".custom-row", function (event) {
+            jQuery(this)
+                .closest("tr")
+                .find(".custom-row")
+                .toggleClass("table-hover", event.type === "mouseenter");
+        });
+    }
+})();
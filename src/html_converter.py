@@ -1,153 +1,597 @@
+import html as html_lib
+import json
+import mmap
 import os
 import re
-
-# Module-level cache for head content
-_HEAD_CONTENT_CACHE = None
-
-
+import tracing
+from dump_importer import normalize_title
+from functools import lru_cache
+from itertools import chain
+from typing import Callable, Iterable, Iterator, List, Match, Optional, TextIO, Union
+from urllib.parse import quote
+
+HEAD_PATH = os.path.join(os.path.dirname(__file__), "html", "head.html")
+PREVIEW_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "html", "preview.js")
+
+# Page template built from head.html, see _page_template
+_PAGE_TEMPLATE = None
+# Page templates kept for heads passed to create_html_page, e.g. a head rewritten for an asset bundle
+CUSTOM_TEMPLATE_CACHE_SIZE = 8
+
+
+# Match different attribute patterns:
+# 1. key="value"
+# 2. key=value
+# 3. class="value"
+# 4. style="value"
+# Keys may only start at a word boundary, so a long run of word characters is scanned once
+# instead of once per starting position.
+ATTRIBUTE_PATTERN = re.compile(r'(?<![\w-])([\w-]+)\s*=\s*(?:"([^"]*)"|([^\s"|][^|]*?)(?=\s|\||$))')
+
+# A table structure line, classified by its leading markup. The name of the matching group says
+# what kind of line it is and the group holds the rest of the line. Lines starting with anything
+# else are content and are skipped without leaving the regex engine.
+STRUCTURE_LINE_PATTERN = re.compile(
+    r"^[^\S\n]*(?:\{\|(?P<table>[^\n]*)|\|\}(?P<end>[^\n]*)|\|-(?P<row>[^\n]*)|!(?P<th>[^\n]*)|\|(?P<td>[^\n]*))",
+    re.MULTILINE,
+)
+
+EMPTY_TABLE_HTML = '<div class="citizen-table-wrapper"><table></table></div>'
+
+# Generated tables repeat a handful of attribute strings (row classes, rowspans, colspans)
+# thousands of times, so the parsed form of each distinct string is kept
+ATTRIBUTE_CACHE_SIZE = 4096
+
+# Inline markup inside cells: internal links, the {{ts}} separator template and bold/italic quotes.
+# Longer quote runs come first so ''''' and ''' are never read as '' followed by stray quotes.
+INLINE_PATTERN = re.compile(
+    r"\[\[(?P<target>[^\[\]|]+)(?:\|(?P<label>[^\[\]]*))?\]\]"
+    r"|(?P<ts>\{\{\s*[Tt]s\s*\}\})"
+    r"|'''''(?P<bold_italic>.+?)'''''"
+    r"|'''(?P<bold>.+?)'''"
+    r"|''(?P<italic>.+?)''"
+)
+
+WIKI_URL = "https://www.arathia.net/wiki/"
+RED_LINK_URL = "https://www.arathia.net/w/index.php?title={}&action=edit&redlink=1"
+TS_TEMPLATE_HTML = '<span class="wiki-ts"> • </span>'
+
+# Descriptions repeat the same links and separators across lists and preview refreshes
+INLINE_CACHE_SIZE = 8192
+
+# Rows per block of a virtualized preview, before extending a block to the end of a rowspan
+VIRTUAL_BLOCK_ROWS = 100
+ROWSPAN_PATTERN = re.compile(r'^<t[dh] [^>]*?\browspan="(\d+)"')
+
+
+@lru_cache(maxsize=ATTRIBUTE_CACHE_SIZE)
 def parse_wiki_attributes(attr_str):
-    """Parse MediaWiki style attributes into HTML attributes."""
+    """Parse MediaWiki style attributes into HTML attributes. Results are memoized."""
     if not attr_str:
         return ""
 
     # Remove any trailing | character and clean whitespace
     attr_str = attr_str.rstrip("|").strip()
 
-    # Early return if just whitespace
-    if not attr_str:
+    # Early return if there can't be any key=value pair
+    if "=" not in attr_str:
         return ""
 
     # Handle class and style attributes separately
     attrs = {}
 
-    # Match different attribute patterns:
-    # 1. key="value"
-    # 2. key=value
-    # 3. class="value"
-    # 4. style="value"
-    pattern = r'([\w-]+)\s*=\s*(?:"([^"]*)"|([^\s"|][^|]*?)(?=\s|\||$))'
-    matches = re.finditer(pattern, attr_str)
-
-    for match in matches:
-        key = match.group(1)
-        # Take the quoted value if it exists, otherwise take the unquoted value
-        value = match.group(2) if match.group(2) is not None else match.group(3)
-        if value is not None:
-            attrs[key] = value.strip()
+    for key, quoted, unquoted in ATTRIBUTE_PATTERN.findall(attr_str):
+        # findall returns "" for a group that didn't take part, so check the quote instead
+        value = quoted if quoted or not unquoted else unquoted
+        attrs[key] = value.strip()
 
     return " ".join(f'{k}="{v}"' for k, v in attrs.items())
 
 
+def _render_link(target: str, label: Optional[str], known_titles: Optional[frozenset]) -> str:
+    target = target.strip()
+    # [[Category:X]] only puts the page in a category and renders nothing
+    if target[:9].lower() == "category:":
+        return ""
+    # A leading colon turns a category or file link into a plain link
+    target = target.lstrip(":")
+    page = normalize_title(target.split("#", 1)[0])
+    text = label if label is not None else target
+
+    if known_titles is not None and page not in known_titles:
+        href = html_lib.escape(RED_LINK_URL.format(quote(page.replace(" ", "_"))))
+        title = html_lib.escape(f"{page} (page does not exist)")
+        return f'<a href="{href}" class="new" title="{title}">{text}</a>'
+
+    href = html_lib.escape(WIKI_URL + quote(target.replace(" ", "_"), safe="/:#"))
+    return f'<a href="{href}" title="{html_lib.escape(page)}">{text}</a>'
+
+
+@lru_cache(maxsize=INLINE_CACHE_SIZE)
+def _render_inline_cached(text: str, known_titles: Optional[frozenset]) -> str:
+    def replace(match):
+        kind = match.lastgroup
+        if kind == "ts":
+            return TS_TEMPLATE_HTML
+        if kind == "bold_italic":
+            return f"<i><b>{_render_inline_cached(match.group('bold_italic'), known_titles)}</b></i>"
+        if kind == "bold":
+            return f"<b>{_render_inline_cached(match.group('bold'), known_titles)}</b>"
+        if kind == "italic":
+            return f"<i>{_render_inline_cached(match.group('italic'), known_titles)}</i>"
+        return _render_link(match.group("target"), match.group("label"), known_titles)
+
+    return INLINE_PATTERN.sub(replace, text)
+
+
+def render_wiki_inline(text: str, known_titles: Optional[Iterable[str]] = None) -> str:
+    """
+    Renders internal links, {{ts}} and bold/italic markup in a cell's content; results are memoized.
+    When `known_titles` is given, links to pages outside it are styled as red links. Pass a
+    frozenset to avoid a copy per call.
+    """
+    if "[[" not in text and "{{" not in text and "''" not in text:
+        return text
+    if known_titles is not None and not isinstance(known_titles, frozenset):
+        known_titles = frozenset(known_titles)
+    return _render_inline_cached(text, known_titles)
+
+
+def _cache_stats(cached_function) -> dict:
+    info = cached_function.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+
+def attribute_cache_stats():
+    """Returns the hit/miss counts, size and hit rate of the attribute cache."""
+    return _cache_stats(parse_wiki_attributes)
+
+
+def inline_cache_stats():
+    """Returns the hit/miss counts, size and hit rate of the inline markup cache."""
+    return _cache_stats(_render_inline_cached)
+
+
+def clear_attribute_cache():
+    parse_wiki_attributes.cache_clear()
+
+
+def clear_inline_cache():
+    _render_inline_cached.cache_clear()
+
+
 def parse_wiki_cell(cell):
     """Parse a wiki cell into attributes and content."""
-    if "|" in cell:
-        attrs, content = cell.split("|", 1)
+    attrs, separator, content = cell.partition("|")
+    # A pipe inside a link or template belongs to the content, not the attribute separator
+    if separator and "[[" not in attrs and "{{" not in attrs:
         return parse_wiki_attributes(attrs), content.strip()
     return "", cell.strip()
 
 
-def wiki_to_html_table(wiki_text):
-    """Convert MediaWiki table syntax to HTML."""
+def wiki_to_html_table(wiki_text, known_titles=None, render_inline=True):
+    """
+    Convert MediaWiki table syntax to HTML. Links, {{ts}} and bold/italic markup in cells are
+    rendered unless `render_inline` is False; see render_wiki_inline for `known_titles`.
+    """
+    with tracing.span("wiki_to_html_table", "render"):
+        return _wiki_to_html_table(wiki_text, _inline_renderer(known_titles, render_inline))
+
+
+def _inline_renderer(known_titles, render_inline) -> Optional[Callable[[str], str]]:
+    if not render_inline:
+        return None
+    if known_titles is not None:
+        known_titles = frozenset(known_titles)
+    return lambda text: render_wiki_inline(text, known_titles)
+
+
+def _wiki_to_html_table(wiki_text, render=None):
+    """
+    Single pass over the structure lines of the input. Every line is classified by the compiled
+    line pattern and the output is collected in one list that is joined once at the end.
+    """
     if not wiki_text:
-        return '<div class="citizen-table-wrapper"><table></table></div>'
+        return EMPTY_TABLE_HTML
 
     html = ['<div class="citizen-table-wrapper">']
-    lines = wiki_text.strip().split("\n")
-    in_table = False
+    _convert_structure_lines(STRUCTURE_LINE_PATTERN.finditer(wiki_text), html.append, render)
+    html.append("</div>")
+    return "\n".join(html)
+
+
+def _convert_structure_lines(
+    matches: Iterable[Match], emit: Callable[[str], None], render: Optional[Callable[[str], str]] = None
+):
+    """
+    Converts classified structure lines to HTML, passing every output line to `emit`.
+    Tables may follow each other or be nested: a table that starts while another one is open is
+    placed in its open cell, and the state of every enclosing table is kept on a stack until the
+    inner table ends. Cells are closed when the next cell, row or table end arrives, so flat
+    tables come out exactly as before.
+    """
+    parse_attributes = parse_wiki_attributes
+    # (needs_row_close, cell_close) of each enclosing table
+    stack = []
+    depth = 0
     needs_row_close = False
+    cell_close = None
 
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
+    for match in matches:
+        kind = match.lastgroup
 
-        if line.startswith("{|"):  # Table start
-            attrs = parse_wiki_attributes(line[2:])
-            html.append(f"<table {attrs}>")
-            html.append("<tbody>")
-            in_table = True
+        if kind == "td" or kind == "th":  # Header or regular cell
+            if not needs_row_close:
+                if cell_close:
+                    emit(cell_close)
+                    cell_close = None
+                emit("<tr>")
+                needs_row_close = True
 
-        elif line.startswith("|}"):  # Table end
-            if needs_row_close:
-                html.append("</tr>")
-                needs_row_close = False
-            html.append("</tbody>")
-            html.append("</table>")
-            in_table = False
+            if kind == "th":
+                cells = match.group(match.lastindex).rstrip().split("!!")
+                open_tag, close_tag = "<th ", "</th>"
+            else:
+                cells = match.group(match.lastindex).rstrip().split("||")
+                open_tag, close_tag = "<td ", "</td>"
 
-        elif line.startswith("|-"):  # Row separator
+            for cell in cells:
+                attrs, separator, content = cell.partition("|")
+                if separator and "[[" not in attrs and "{{" not in attrs:
+                    attrs = parse_attributes(attrs) if "=" in attrs else ""
+                    content = content.strip()
+                else:
+                    content = cell.strip()
+                    if not content:
+                        continue
+                    attrs = ""
+                if render is not None:
+                    content = render(content)
+                if cell_close:
+                    emit(cell_close)
+                emit(f"{open_tag}{attrs}>{content}")
+                cell_close = close_tag
+
+        elif kind == "row":  # Row separator
+            if cell_close:
+                emit(cell_close)
+                cell_close = None
             if needs_row_close:
-                html.append("</tr>")
-            html.append("<tr>")
+                emit("</tr>")
+            emit("<tr>")
             needs_row_close = True
 
-        elif line.startswith("!") or line.startswith("|"):  # Header or regular cell
-            if not needs_row_close:
-                html.append("<tr>")
-                needs_row_close = True
+        elif kind == "table":  # Table start
+            if depth:
+                # Nested table: it goes into the open cell, which stays open until the table ends
+                stack.append((needs_row_close, cell_close))
+                needs_row_close = False
+                cell_close = None
+            elif cell_close:
+                emit(cell_close)
+                cell_close = None
+            depth += 1
+            emit(f"<table {parse_attributes(match.group(match.lastindex))}>")
+            emit("<tbody>")
+
+        else:  # Table end
+            if cell_close:
+                emit(cell_close)
+                cell_close = None
+            if needs_row_close:
+                emit("</tr>")
+                needs_row_close = False
+            emit("</tbody>")
+            emit("</table>")
+            if stack:
+                needs_row_close, cell_close = stack.pop()
+            depth = max(depth - 1, 0)
+
+    # Close whatever the input left open, innermost table first
+    while True:
+        if cell_close:
+            emit(cell_close)
+        if needs_row_close:
+            emit("</tr>")
+        if not depth:
+            break
+        emit("</tbody>")
+        emit("</table>")
+        depth -= 1
+        needs_row_close, cell_close = stack.pop() if stack else (False, None)
+
+
+class TableBlocks:
+    """
+    A converted table split into blocks of whole rows, so a preview can render only the blocks
+    in view. No rowspan crosses a block boundary, so every block renders correctly on its own.
+    Attributes:
+        head (str): Everything up to and including the opening <tbody> of the table.
+        blocks (List[str]): The rows of the table body, `rows_per_block` rows or a few more per block.
+        row_counts (List[int]): The number of rows in each block.
+        tail (str): The closing tags of the table and anything after it.
+    Input that isn't a single top-level table is not split and is held entirely in `head`.
+    """
+
+    def __init__(self, head: str, blocks: List[str], row_counts: List[int], tail: str):
+        self.head = head
+        self.blocks = blocks
+        self.row_counts = row_counts
+        self.tail = tail
+
+    @property
+    def row_count(self) -> int:
+        return sum(self.row_counts)
+
+    def to_html(self) -> str:
+        """Returns the same HTML as wiki_to_html_table"""
+        return "\n".join(part for part in (self.head, *self.blocks, self.tail) if part)
+
+
+def wiki_to_html_blocks(wiki_text, rows_per_block=VIRTUAL_BLOCK_ROWS, known_titles=None, render_inline=True):
+    """Converts MediaWiki table syntax to HTML like wiki_to_html_table, split into TableBlocks."""
+    with tracing.span("wiki_to_html_blocks", "render"):
+        lines = _wiki_to_html_table(wiki_text, _inline_renderer(known_titles, render_inline)).split("\n")
+        return _split_table_blocks(lines, rows_per_block)
+
+
+def _split_table_blocks(lines: List[str], rows_per_block: int) -> TableBlocks:
+    depth = 0
+    body_start = body_end = None
+    for index, line in enumerate(lines):
+        if line.startswith("<table "):
+            depth += 1
+            if depth == 1:
+                if body_start is not None:
+                    # A second top-level table, leave the input in one piece
+                    return TableBlocks("\n".join(lines), [], [], "")
+                body_start = index + 2
+        elif line == "</table>":
+            depth -= 1
+            if depth == 0 and body_end is None:
+                body_end = index - 1
+
+    if body_start is None or body_end is None or lines[body_start - 1] != "<tbody>":
+        return TableBlocks("\n".join(lines), [], [], "")
+
+    blocks = []
+    row_counts = []
+    current = []
+    rows = 0
+    row_index = -1
+    # Last row covered by a rowspan seen so far; a block may only end after it
+    span_end = -1
+    depth = 1
+    for line in lines[body_start:body_end]:
+        if depth == 1:
+            if line == "<tr>":
+                if rows >= rows_per_block and span_end <= row_index:
+                    blocks.append("\n".join(current))
+                    row_counts.append(rows)
+                    current = []
+                    rows = 0
+                row_index += 1
+                rows += 1
+            elif 'rowspan="' in line and (line.startswith("<td ") or line.startswith("<th ")):
+                span = ROWSPAN_PATTERN.search(line)
+                if span:
+                    span_end = max(span_end, row_index + int(span.group(1)) - 1)
+        if line.startswith("<table "):
+            depth += 1
+        elif line == "</table>":
+            depth -= 1
+        current.append(line)
+
+    if current:
+        blocks.append("\n".join(current))
+        row_counts.append(rows)
+    return TableBlocks("\n".join(lines[:body_start]), blocks, row_counts, "\n".join(lines[body_end:]))
+
+
+class _ChunkWriter:
+    """Joins output lines with newlines and hands them to `write` in chunks of `chunk_lines` lines."""
+
+    def __init__(self, write: Callable[[str], object], chunk_lines: int = 512):
+        self.write = write
+        self.chunk_lines = chunk_lines
+        self.pending = []
+        self.started = False
+
+    def emit(self, line: str):
+        self.pending.append(line)
+        if len(self.pending) >= self.chunk_lines:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        chunk = "\n".join(self.pending)
+        self.write("\n" + chunk if self.started else chunk)
+        self.started = True
+        self.pending.clear()
+
+
+def stream_wiki_to_html(
+    lines: Iterable[Union[str, bytes]],
+    out: Union[TextIO, Callable[[str], object]],
+    known_titles=None,
+    render_inline=True,
+):
+    """
+    Converts MediaWiki table syntax to HTML without holding the input or the output in memory.
+    Args:
+        lines: Any iterable of lines, such as an open text file, a list or a generator. Byte
+            lines (from binary files or iter_mmap_lines) are decoded as UTF-8.
+        out: A writable text stream, or a function that is called with each HTML chunk.
+        known_titles, render_inline: As for wiki_to_html_table.
+    The concatenated chunks are identical to wiki_to_html_table on the joined input.
+    """
+    write = out if callable(out) else out.write
+
+    with tracing.span("stream_wiki_to_html", "render"):
+        lines = iter(lines)
+        # Input without any lines gets the same empty table as wiki_to_html_table
+        first_line = next(lines, None)
+        if first_line is None:
+            write(EMPTY_TABLE_HTML)
+            return
+
+        writer = _ChunkWriter(write)
+        writer.emit('<div class="citizen-table-wrapper">')
+        _convert_structure_lines(
+            _match_structure_lines(chain((first_line,), lines)),
+            writer.emit,
+            _inline_renderer(known_titles, render_inline),
+        )
+        writer.emit("</div>")
+        writer.flush()
+
+
+def _match_structure_lines(lines: Iterable[Union[str, bytes]]) -> Iterator[Match]:
+    match_line = STRUCTURE_LINE_PATTERN.match
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        match = match_line(line)
+        if match:
+            yield match
+
+
+def iter_mmap_lines(path: str) -> Iterator[bytes]:
+    """Yields the lines of a file through a read-only memory map, without reading it into memory."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter(mapped.readline, b"")
+
+
+def convert_file(source_path: str, destination: Union[str, TextIO, Callable[[str], object]], **options):
+    """
+    Converts a wikitext file to HTML, streaming from a memory map into a path, stream or callback.
+    `options` are passed on to stream_wiki_to_html.
+    """
+    if isinstance(destination, str):
+        with open(destination, "w", encoding="utf-8", newline="\n") as out:
+            stream_wiki_to_html(iter_mmap_lines(source_path), out, **options)
+    else:
+        stream_wiki_to_html(iter_mmap_lines(source_path), destination, **options)
+
+
+DEFAULT_HEAD_CONTENT = """<head>
+    <meta charset="UTF-8">
+    <link rel="stylesheet" href="https://arathia.net/w/load.php?lang=en&amp;modules=site.styles&amp;only=styles&amp;skin=citizen">
+    <title>Arathia Wiki Table</title>
+</head>"""
 
-            is_header = line.startswith("!")
-            tag = "th" if is_header else "td"
-            cells = line[1:].split("||" if not is_header else "!!")
 
-            for cell in cells:
-                if cell.strip():
-                    attrs, content = parse_wiki_cell(cell)
-                    html.append(f"<{tag} {attrs}>{content}\n</{tag}>")
+class _PageTemplate:
+    """The page around a table, split at load time into the static text before and after it."""
 
-        i += 1
+    def __init__(self, head_content: str, mtime_ns: Optional[int]):
+        self.head_content = head_content
+        self.mtime_ns = mtime_ns
+        self.prefix = f"<!DOCTYPE html>\n<html>\n{head_content}\n<body>\n    "
+        self.suffix = "\n</body>\n</html>"
+        self.prefix_bytes = self.prefix.encode("utf-8")
+        self.suffix_bytes = self.suffix.encode("utf-8")
 
-    if needs_row_close:
-        html.append("</tr>")
-    if in_table:
-        html.append("</tbody>")
-        html.append("</table>")
 
-    html.append("</div>")
-    return "\n".join(html)
+def _head_mtime() -> Optional[int]:
+    try:
+        return os.stat(HEAD_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
 
 
-def load_head_content(force_reload=False):
-    """Loads the head content from head.html file with caching support."""
-    global _HEAD_CONTENT_CACHE
-
-    # Return cached content unless force_reload is True
-    if _HEAD_CONTENT_CACHE is not None and not force_reload:
-        return _HEAD_CONTENT_CACHE
-
-    possible_paths = [
-        "./html/head.html",
-        "html/head.html",
-        "../html/head.html",
-        os.path.join(os.path.dirname(__file__), "html/head.html"),
-        os.path.join(os.path.dirname(__file__), "../html/head.html"),
-    ]
-
-    for path in possible_paths:
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                _HEAD_CONTENT_CACHE = f.read()
-                return _HEAD_CONTENT_CACHE
-        except FileNotFoundError:
-            continue
-
-    # If no file is found, use default head content
-    print("Head.html not found in any location. Using default head content.")
-    _HEAD_CONTENT_CACHE = """<head>
-    <meta charset="UTF-8">
-    <link rel="stylesheet" href="https://arathia.net/w/load.php?lang=en&amp;modules=site.styles&amp;only=styles&amp;skin=citizen">
-    <title>Arathia Wiki Table</title>
-</head>"""
-    return _HEAD_CONTENT_CACHE
+def _page_template(force_reload=False, check_changed=False) -> _PageTemplate:
+    """
+    Returns the cached page template. head.html is read on first use and with `force_reload`;
+    with `check_changed`, it is read again if its mtime has changed. Renders check nothing.
+    """
+    global _PAGE_TEMPLATE
+
+    if _PAGE_TEMPLATE is not None and not force_reload and not check_changed:
+        return _PAGE_TEMPLATE
+    mtime_ns = _head_mtime()
+    if _PAGE_TEMPLATE is not None and not force_reload and _PAGE_TEMPLATE.mtime_ns == mtime_ns:
+        return _PAGE_TEMPLATE
+
+    try:
+        with open(HEAD_PATH, "r", encoding="utf-8") as f:
+            head_content = f.read()
+    except FileNotFoundError:
+        print(f"{HEAD_PATH} not found. Using default head content.")
+        head_content = DEFAULT_HEAD_CONTENT
+        mtime_ns = None
+
+    _PAGE_TEMPLATE = _PageTemplate(head_content, mtime_ns)
+    return _PAGE_TEMPLATE
+
+
+def load_head_content(force_reload=False, check_changed=False):
+    """Loads the head content from head.html, cached until reloaded, see _page_template."""
+    return _page_template(force_reload, check_changed).head_content
+
+
+@lru_cache(maxsize=CUSTOM_TEMPLATE_CACHE_SIZE)
+def _custom_page_template(head_content: str) -> _PageTemplate:
+    return _PageTemplate(head_content, None)
+
+
+def _template_for(head_content: Optional[str]) -> _PageTemplate:
+    return _page_template() if head_content is None else _custom_page_template(head_content)
 
 
-def create_html_page(table_html):
+def create_html_page(table_html, head_content=None):
     """Creates a complete HTML page with the required stylesheet and table content."""
-    head_content = load_head_content()
-    html = f"""<!DOCTYPE html>
-<html>
-{head_content}
-<body>
-    {table_html}
-</body>
-</html>"""
-    return html
+    template = _template_for(head_content)
+    return template.prefix + table_html + template.suffix
+
+
+def create_html_page_bytes(table_html, head_content=None) -> bytes:
+    """
+    Creates the page of create_html_page as UTF-8. Only the table is encoded per call; the
+    head is encoded once when it is loaded, or for a passed head once it is first used.
+    """
+    template = _template_for(head_content)
+    return b"".join((template.prefix_bytes, table_html.encode("utf-8"), template.suffix_bytes))
+
+
+def create_preview_shell(asset_bundle=None) -> bytes:
+    """
+    Creates the preview page, as UTF-8, that is loaded once and then updated in place with
+    preview_patch_script, so the head's scripts and stylesheets are only loaded once.
+    With an AssetBundle, the head loads its bundled assets from the asset scheme instead of the network;
+    modules and url() assets those request at runtime still come from the wiki.
+    """
+    with open(PREVIEW_SCRIPT_PATH, "r", encoding="utf-8") as f:
+        script = f.read()
+    head_content = None
+    if asset_bundle is not None:
+        head_content = asset_bundle.rewrite_head(load_head_content())
+    body = f'<div id="preview-root"></div>\n    <script>\n{script}\n    </script>'
+    return create_html_page_bytes(body, head_content)
+
+
+def preview_patch_script(table_html):
+    """Returns the JavaScript that swaps `table_html` into a page made by create_preview_shell."""
+    return f"patchPreview({json.dumps(table_html)});"
+
+
+def virtual_preview_script(table_blocks):
+    """Returns the JavaScript that shows TableBlocks in a preview shell, rendering only the blocks in view."""
+    data = {
+        "head": table_blocks.head,
+        "blocks": table_blocks.blocks,
+        "rows": table_blocks.row_counts,
+        "tail": table_blocks.tail,
+    }
+    return f"showVirtualPreview({json.dumps(data)});"
@@ -2,8 +2,8 @@ from wiki_template import WikiTemplate, ManualWikiTemplate, CategoryMap
 
 
 class GenericListBuilder:
-    def __init__(self, title, category_name: str, category_map: CategoryMap):
-        self.template = WikiTemplate(title, category_map)
+    def __init__(self, title, category_name: str, category_map: CategoryMap, wiki_api=None, max_workers: int = 10):
+        self.template = WikiTemplate(title, category_map, wiki_api, max_workers)
         print(category_map)
         self.template.fetch_category(category_name)
 
@@ -20,7 +20,7 @@ class ManualListBuilder:
 
 
 class CharacterListBuilder:
-    def __init__(self):
+    def __init__(self, wiki_api=None, max_workers: int = 10):
         categories = {
             "Humanoid Characters": {
                 "Major Races": {
@@ -54,7 +54,7 @@ class CharacterListBuilder:
 
         category_map = CategoryMap(categories, category_titles)
         self.generic_builder = GenericListBuilder(
-            "List of Characters", "Characters", category_map
+            "List of Characters", "Characters", category_map, wiki_api, max_workers
         )
 
     def build(self) -> str:
@@ -62,7 +62,7 @@ class CharacterListBuilder:
 
 
 class CountryListBuilder:
-    def __init__(self):
+    def __init__(self, wiki_api=None):
         categories = {
             "Arathia": {
                 "Major Countries": {},
@@ -86,7 +86,7 @@ class CountryListBuilder:
 
         category_map = CategoryMap(categories, category_titles)
         self.generic_builder = GenericListBuilder(
-            "List of Countries", "Countries", category_map
+            "List of Countries", "Countries", category_map, wiki_api
         )
 
     def build(self) -> str:
@@ -94,7 +94,7 @@ class CountryListBuilder:
 
 
 class CityListBuilder:
-    def __init__(self):
+    def __init__(self, wiki_api=None):
         categories = {
             "Capital Cities": {},
             "Grandholds": {},
@@ -107,7 +107,7 @@ class CityListBuilder:
 
         category_map = CategoryMap(categories)
         self.generic_builder = GenericListBuilder(
-            "List of Cities", "Cities", category_map
+            "List of Cities", "Cities", category_map, wiki_api
         )
 
     def build(self) -> str:
@@ -115,7 +115,7 @@ class CityListBuilder:
 
 
 class OathListBuilder:
-    def __init__(self):
+    def __init__(self, wiki_api=None):
         categories = {
             "Solar Oaths": {},
             "Void Oaths": {},
@@ -136,7 +136,7 @@ class OathListBuilder:
 
         category_map = CategoryMap(categories, category_titles)
         self.generic_builder = GenericListBuilder(
-            "List of [[Oaths]]", "Oaths", category_map
+            "List of [[Oaths]]", "Oaths", category_map, wiki_api
         )
 
     def build(self) -> str:
@@ -144,7 +144,7 @@ class OathListBuilder:
 
 
 class SpeciesListBuilder:
-    def __init__(self):
+    def __init__(self, wiki_api=None):
         categories = {
             "Godly": {
                 "Chordata": {
@@ -192,7 +192,7 @@ class SpeciesListBuilder:
 
         category_map = CategoryMap(categories, category_titles)
         self.generic_builder = GenericListBuilder(
-            "List of Species", "Species", category_map
+            "List of Species", "Species", category_map, wiki_api
         )
 
     def build(self) -> str:
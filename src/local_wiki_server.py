@@ -0,0 +1,378 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Root categories and the subcategories their pages are spread over. The names match the
+# category maps of the list builders so the builders can run unchanged against the server.
+DEFAULT_TOPICS = {
+    "Characters": [
+        "Human Characters",
+        "Draconian Characters",
+        "Eldarin Characters",
+        "Moros Characters",
+        "Demonborn Characters",
+        "Vampire Characters",
+        "Giant Characters",
+        "God Characters",
+        "Demigod Characters",
+        "Dragon Characters",
+    ],
+    "Countries": [
+        "Major Countries",
+        "Minor Countries",
+        "Fallen Countries",
+        "Major Elysian Countries",
+        "Minor Elysian Countries",
+        "Fallen Elysian Countries",
+    ],
+    "Cities": ["Capital Cities", "Grandholds", "Greast Cities", "Cities", "Towns", "Villages", "Hamlets"],
+    "Oaths": ["Solar Oaths", "Void Oaths", "Arc Oaths", "Vampiric Oaths", "Soulseeker Oaths", "Dragon Oaths"],
+    "Species": [
+        "Humanoid Species",
+        "Mammalia",
+        "Aves",
+        "Aquatic Godly Species",
+        "Polyphaga",
+        "Arachnida",
+        "Humanoid Aetherial Species",
+        "Draconia",
+        "General Species",
+        "Unknown Species",
+    ],
+}
+
+MAX_LIMIT = 500
+
+
+class SyntheticWiki:
+    """
+    A generated wiki of `page_count` pages, answering the subset of api.php queries WikiAPI uses.
+    Pages are not stored: page N is titled "<Topic> Page N" and its categories are derived from N,
+    so a wiki of a million pages costs no more memory than one of ten thousand.
+    Supported queries:
+        list=categorymembers with cmlimit and cmcontinue
+        prop=categories with batched titles, cllimit and clcontinue
+    Attributes:
+        page_count (int): Number of content pages in the wiki.
+        topics (Dict[str, List[str]]): Root categories and their subcategories.
+    """
+
+    def __init__(self, page_count: int = 10_000, topics: Dict[str, List[str]] = None):
+        self.page_count = page_count
+        self.topics = topics or DEFAULT_TOPICS
+        self.topic_names = list(self.topics)
+        self.subcategory_parent = {sub: topic for topic, subs in self.topics.items() for sub in subs}
+
+    # Page layout
+
+    def page_title(self, number: int) -> str:
+        return f"{self.topic_names[number % len(self.topic_names)]} Page {number}"
+
+    def page_number(self, title: str) -> Optional[int]:
+        topic, _, number = title.rpartition(" Page ")
+        if not number.isdigit():
+            return None
+        number = int(number)
+        if number >= self.page_count or self.page_title(number) != title:
+            return None
+        return number
+
+    def page_categories(self, number: int) -> List[str]:
+        topic = self.topic_names[number % len(self.topic_names)]
+        subcategories = self.topics[topic]
+        # Knuth's multiplicative hash spreads consecutive pages over the subcategories
+        first = subcategories[(number * 2654435761) % len(subcategories)]
+        categories = [topic, first]
+        if number % 7 == 0:
+            second = subcategories[(number * 40503) % len(subcategories)]
+            if second != first:
+                categories.append(second)
+        return categories
+
+    def category_entries(self, category: str, start: int = 0):
+        """Yields (pageid, ns, title) for the members of a category in listing order, from position `start`"""
+        if category in self.topics:
+            subcategories = self.topics[category]
+            for sub in subcategories[start:]:
+                yield self.category_page_id(sub), 14, f"Category:{sub}"
+            # Topic pages are every n-th page, so the start position maps straight to a page number
+            topic_index = self.topic_names.index(category)
+            first = topic_index + max(start - len(subcategories), 0) * len(self.topic_names)
+            for number in range(first, self.page_count, len(self.topic_names)):
+                yield number + 1, 0, self.page_title(number)
+        elif category in self.subcategory_parent:
+            topic_index = self.topic_names.index(self.subcategory_parent[category])
+            position = 0
+            for number in range(topic_index, self.page_count, len(self.topic_names)):
+                if category in self.page_categories(number):
+                    if position >= start:
+                        yield number + 1, 0, self.page_title(number)
+                    position += 1
+
+    def category_page_id(self, category: str) -> int:
+        return self.page_count + 1 + list(self.subcategory_parent).index(category)
+
+    # API
+
+    def handle(self, params: Dict[str, str]) -> dict:
+        """Returns the api.php JSON response for a query"""
+        if params.get("action") != "query":
+            return _error("badvalue", "Only action=query is supported")
+        if params.get("list") == "categorymembers":
+            return self._category_members(params)
+        if params.get("prop") == "categories":
+            return self._page_categories(params)
+        return _error("badvalue", "Unsupported query")
+
+    def _category_members(self, params: Dict[str, str]) -> dict:
+        title = params.get("cmtitle", "")
+        if not title.startswith("Category:"):
+            return _error("invalidcategory", "The category name you entered is not valid")
+
+        limit = _parse_limit(params.get("cmlimit"), 10)
+        offset = int(params.get("cmcontinue", "0") or 0)
+
+        members = []
+        has_more = False
+        for pageid, ns, member in self.category_entries(title[len("Category:") :], offset):
+            if len(members) == limit:
+                has_more = True
+                break
+            members.append({"pageid": pageid, "ns": ns, "title": member})
+
+        response = {"batchcomplete": "", "query": {"categorymembers": members}}
+        if has_more:
+            response["continue"] = {"cmcontinue": str(offset + limit), "continue": "-||"}
+        return response
+
+    def _page_categories(self, params: Dict[str, str]) -> dict:
+        titles = [title for title in params.get("titles", "").split("|") if title]
+        if len(titles) > 50:
+            return _error("toomanyvalues", "Too many values supplied for parameter titles. The limit is 50.")
+
+        limit = _parse_limit(params.get("cllimit"), 10)
+        offset = int(params.get("clcontinue", "0") or 0)
+
+        normalized = []
+        pages = {}
+        links: List[Tuple[str, str]] = []
+        missing_id = -1
+        for title in titles:
+            clean = title.replace("_", " ")
+            if clean != title:
+                normalized.append({"from": title, "to": clean})
+
+            number = self.page_number(clean)
+            if number is None:
+                pages[str(missing_id)] = {"ns": 0, "title": clean, "missing": ""}
+                missing_id -= 1
+                continue
+
+            key = str(number + 1)
+            pages[key] = {"pageid": number + 1, "ns": 0, "title": clean}
+            links.extend((key, category) for category in self.page_categories(number))
+
+        # The limit applies to the category links of all pages in the batch together
+        for key, category in links[offset : offset + limit]:
+            pages[key].setdefault("categories", []).append({"ns": 14, "title": f"Category:{category}"})
+
+        query = {"pages": pages}
+        if normalized:
+            query["normalized"] = normalized
+        response = {"query": query}
+        if offset + limit < len(links):
+            response["continue"] = {"clcontinue": str(offset + limit), "continue": "||"}
+        else:
+            response["batchcomplete"] = ""
+        return response
+
+
+def _parse_limit(value: Optional[str], default: int) -> int:
+    if value == "max":
+        return MAX_LIMIT
+    if value and value.isdigit():
+        return max(1, min(int(value), MAX_LIMIT))
+    return default
+
+
+def _error(code: str, info: str, **extra) -> dict:
+    return {"error": {"code": code, "info": info, **extra}}
+
+
+class LocalWikiServer(ThreadingHTTPServer):
+    """
+    An HTTP server that serves a SyntheticWiki as api.php, with knobs for load testing.
+    Attributes:
+        wiki (SyntheticWiki): The wiki being served.
+        latency (float): Seconds added to every response.
+        jitter (float): Maximum random deviation from `latency`, in seconds.
+        error_rate (float): Fraction of requests answered with HTTP 503.
+        lag (float): Simulated replication lag; requests whose maxlag is lower are rejected.
+        request_count (int): Number of requests served so far.
+        error_count (int): Number of requests answered with an error.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        wiki: SyntheticWiki = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        lag: float = 0.0,
+        seed: Optional[int] = 0,
+    ):
+        super().__init__(address, LocalWikiRequestHandler)
+        self.wiki = wiki or SyntheticWiki()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.lag = lag
+        self.request_count = 0
+        self.error_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/w/api.php"
+
+    def next_delay_and_failure(self) -> Tuple[float, bool]:
+        """Counts a request and decides its simulated latency and whether it fails"""
+        with self._lock:
+            self.request_count += 1
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failed:
+                self.error_count += 1
+        return max(delay, 0.0), failed
+
+    def count_error(self):
+        with self._lock:
+            self.error_count += 1
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class LocalWikiRequestHandler(BaseHTTPRequestHandler):
+    server: LocalWikiServer
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.endswith("api.php"):
+            self.send_error(404)
+            return
+
+        params = {key: values[-1] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        delay, failed = self.server.next_delay_and_failure()
+        if delay:
+            time.sleep(delay)
+
+        if failed:
+            self._send_json(_error("internal_api_error", "Simulated server error"), 503, {"Retry-After": "0"})
+            return
+
+        maxlag = params.get("maxlag")
+        if maxlag is not None and self.server.lag > float(maxlag):
+            self.server.count_error()
+            body = _error("maxlag", f"Waiting for a database server: {self.server.lag} seconds lagged.", lag=self.server.lag)
+            self._send_json(body, 200, {"Retry-After": "0", "X-Database-Lag": str(self.server.lag)})
+            return
+
+        self._send_json(self.server.wiki.handle(params))
+
+    def _send_json(self, body: dict, status: int = 200, headers: Dict[str, str] = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_load_test(sizes: List[int], worker_counts: List[int], **server_options) -> List[dict]:
+    """
+    Builds the character list against servers of each size with each worker count.
+    Returns:
+        List[dict]: One result per run with the wiki size, workers, seconds and request count.
+    """
+    from api import WikiAPI
+    from list_builder import CharacterListBuilder
+    import contextlib
+    import io
+
+    results = []
+    for size in sizes:
+        server = LocalWikiServer(wiki=SyntheticWiki(size), **server_options)
+        server.start_in_thread()
+        try:
+            for workers in worker_counts:
+                server.request_count = 0
+                api = WikiAPI(base_url=server.base_url, maxlag=5)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    # The builder fetches the category once, with the worker count under test
+                    CharacterListBuilder(api, max_workers=workers).build()
+                elapsed = time.perf_counter() - start
+                result = {"pages": size, "workers": workers, "seconds": elapsed, "requests": server.request_count}
+                results.append(result)
+                print(f"{size:>9} pages  {workers:>3} workers  {elapsed:8.2f}s  {server.request_count:>6} requests")
+        finally:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic wiki through a local api.php stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pages", type=int, default=10_000, help="Number of synthetic pages")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random latency deviation in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail with 503")
+    parser.add_argument("--lag", type=float, default=0.0, help="Simulated replication lag for maxlag checks")
+    parser.add_argument(
+        "--load-test",
+        metavar="SIZES",
+        help="Instead of serving, build the character list against wikis of these comma separated sizes",
+    )
+    parser.add_argument("--workers", default="1,10,32", help="Comma separated worker counts for --load-test")
+    args = parser.parse_args()
+
+    options = {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate, "lag": args.lag}
+
+    if args.load_test:
+        sizes = [int(size) for size in args.load_test.split(",")]
+        workers = [int(count) for count in args.workers.split(",")]
+        run_load_test(sizes, workers, **options)
+        return
+
+    server = LocalWikiServer((args.host, args.port), SyntheticWiki(args.pages), **options)
+    print(f"Serving {args.pages} synthetic pages at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,44 @@ from list_builder import (
     OathListBuilder,
     SpeciesListBuilder,
 )
+from dump_importer import DumpCategoryIndex
+from cassette import Cassette
+from api import WikiAPI
+import argparse
+import tracing
 import pyperclip
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate Arathia wiki lists.")
+    parser.add_argument(
+        "--dump",
+        help="Build the lists offline from a pages-articles XML dump (.xml, .xml.gz or .xml.bz2)",
+    )
+    parser.add_argument("--record", metavar="CASSETTE", help="Record all wiki requests to a cassette file")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Serve wiki requests from a recorded cassette file")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per replayed request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random latency deviation in seconds")
+    parser.add_argument("--trace", metavar="FILE", help="Write a Chrome trace (JSON) of the build to FILE")
+    return parser.parse_args()
+
+
+def create_wiki_api(args):
+    if args.dump:
+        return DumpCategoryIndex.from_dump(args.dump, logging=True), None
+    if args.record:
+        cassette = Cassette(args.record, "record")
+    elif args.replay:
+        cassette = Cassette(args.replay, "replay", latency=args.latency, jitter=args.jitter)
+    else:
+        return None, None
+    return WikiAPI(cassette=cassette), cassette
+
+
 def main():
+    args = parse_args()
+    wiki_api, cassette = create_wiki_api(args)
+
     builders = [
         CharacterListBuilder,
         CountryListBuilder,
@@ -20,8 +54,25 @@ def main():
         print(f"{i}. {builder.__name__}")
 
     choice = int(input("\nSelect a list to generate: "))
-    builder = builders[choice - 1]()
-    wiki_table = builder.build()
+    if args.trace:
+        tracing.enable()
+
+    with tracing.span(f"{builders[choice - 1].__name__}", "main"):
+        with tracing.span("fetch", "main"):
+            builder = builders[choice - 1](wiki_api)
+        with tracing.span("build", "main"):
+            wiki_table = builder.build()
+
+    if args.trace:
+        tracer = tracing.disable()
+        tracer.export_chrome_trace(args.trace)
+        print(f"\nTrace written to {args.trace}")
+        for name, total in sorted(tracer.summary().items(), key=lambda item: -item[1]["ms"]):
+            print(f"  {name:<32} {total['ms']:10.1f} ms  ({total['count']}x)")
+
+    if cassette is not None and cassette.recording:
+        cassette.save()
+        print(f"\nRecorded {len(cassette)} responses to {cassette.path}")
     try:
         pyperclip.copy(wiki_table)
         print("\nTable copied to clipboard!")
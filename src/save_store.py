@@ -0,0 +1,767 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+SAVE_SUFFIX = ".json.gz"
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+JOURNAL_SUFFIX = ".journal"
+HISTORY_DIRECTORY = "history"
+HISTORY_SUFFIX = ".undo"
+
+# Serializes read-modify-write cycles of index files between the save worker and the GUI thread
+_index_lock = threading.Lock()
+
+
+def encode_save(data: dict) -> bytes:
+    """Serializes list data to the gzip compressed JSON of a save file"""
+    return gzip.compress(json.dumps(data).encode("utf-8"))
+
+
+def display_title(data: dict) -> str:
+    """Returns the title a list is shown under, the first one for lists with several titles"""
+    title = data.get("__title", "Untitled")
+    if isinstance(title, list):
+        return title[0]["title"] if isinstance(title[0], dict) else title[0]
+    if isinstance(title, dict):
+        return title["title"]
+    return str(title)
+
+
+def _is_item(value: dict) -> bool:
+    return value.get("__metadata", {}).get("type") == "item" or "description" in value
+
+
+def count_items(data: dict) -> int:
+    """Counts the items (leaf entries) of list data"""
+    count = 0
+    for key, value in data.items():
+        if key.startswith("__") or not isinstance(value, dict):
+            continue
+        if _is_item(value):
+            count += 1
+        else:
+            count += count_items(value)
+    return count
+
+
+def data_hash(data: dict) -> str:
+    """Returns a hash of list data that does not depend on how it was serialized"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def index_entry(save_id: str, data: dict, path: str) -> dict:
+    """Describes the save file at `path` holding `data` for the save index"""
+    stat = os.stat(path)
+    return {
+        "id": save_id,
+        "title": display_title(data),
+        "mtime": stat.st_mtime,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "items": count_items(data),
+        "hash": data_hash(data),
+    }
+
+
+def _read_index(saves_dir: str) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(saves_dir, INDEX_NAME), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return {entry["id"]: entry for entry in index.get("saves", [])}
+
+
+def _write_index(saves_dir: str, entries: Dict[str, dict]):
+    index = {"version": INDEX_VERSION, "saves": sorted(entries.values(), key=lambda entry: entry["id"])}
+    write_atomic(os.path.join(saves_dir, INDEX_NAME), json.dumps(index, indent=4).encode("utf-8"))
+
+
+def update_index(saves_dir: str, entry: dict):
+    """Adds or replaces the index entry of one save"""
+    with _index_lock:
+        entries = _read_index(saves_dir)
+        entries[entry["id"]] = entry
+        _write_index(saves_dir, entries)
+
+
+def remove_from_index(saves_dir: str, save_id: str):
+    with _index_lock:
+        entries = _read_index(saves_dir)
+        if entries.pop(save_id, None) is not None:
+            _write_index(saves_dir, entries)
+
+
+def load_index(saves_dir: str) -> List[dict]:
+    """
+    Returns the index entries of every save in `saves_dir`. Only saves whose file is missing from
+    the index or changed since it was indexed (by size and modification time) are read, and the
+    index file is rewritten when anything was out of date.
+    """
+    if not os.path.isdir(saves_dir):
+        return []
+    with _index_lock:
+        entries = _read_index(saves_dir)
+        current = {}
+        changed = False
+        for file in os.listdir(saves_dir):
+            if not file.endswith(SAVE_SUFFIX):
+                continue
+            save_id = file[: -len(SAVE_SUFFIX)]
+            path = os.path.join(saves_dir, file)
+            entry = entries.get(save_id)
+            try:
+                stat = os.stat(path)
+                if entry is None or entry.get("mtime_ns") != stat.st_mtime_ns or entry.get("size") != stat.st_size:
+                    with gzip.open(path, "rt", encoding="utf-8") as f:
+                        entry = index_entry(save_id, json.load(f), path)
+                    changed = True
+            except (OSError, ValueError):
+                continue  # Unreadable saves are left out, as before the index existed
+            current[save_id] = entry
+        if changed or current.keys() != entries.keys():
+            _write_index(saves_dir, current)
+    return list(current.values())
+
+
+def write_atomic(path: str, content: bytes):
+    """
+    Writes `content` to a temporary file next to `path` and renames it over `path`, so readers
+    and crashes only ever see the old or the new file, never a partial one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class BackupStore:
+    """
+    Versioned backups of one list, stored as content-addressed blobs. Every category and
+    subcategory is a blob of its own, named by the hash of its content, with child categories
+    replaced by references to their blobs; items are kept inline in their parent's blob. A new
+    version only writes the blobs of the subtrees that changed and shares every other blob with
+    the versions before it. The manifest lists the versions, newest last, and the size and child
+    blobs of every blob, so versions beyond the limit can be dropped and the blobs no remaining
+    version reaches removed without reading any blob.
+    Backups written as full copies (backup_*.json.gz) by older versions stay listed and restorable.
+    Attributes:
+        backup_dir (str): Directory of the list's backups.
+    Example:
+        store = BackupStore(os.path.join("saves", "backups", save_id))
+        store.add_version(data, max_versions=5)
+        data = store.load(store.versions()[0])
+    """
+
+    MANIFEST_NAME = "versions.json"
+    MANIFEST_VERSION = 1
+    BLOB_REFERENCE = "__blob"
+
+    def __init__(self, backup_dir: str):
+        self.backup_dir = backup_dir
+        self.object_dir = os.path.join(backup_dir, "objects")
+        self.manifest_path = os.path.join(backup_dir, self.MANIFEST_NAME)
+
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == self.MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"version": self.MANIFEST_VERSION, "versions": [], "objects": {}}
+
+    def _object_path(self, blob_hash: str) -> str:
+        return os.path.join(self.object_dir, blob_hash[:2], blob_hash + ".json.gz")
+
+    def _legacy_backups(self) -> List[dict]:
+        if not os.path.isdir(self.backup_dir):
+            return []
+        backups = []
+        for file in os.listdir(self.backup_dir):
+            if file.startswith("backup_") and file.endswith(".json.gz"):
+                path = os.path.join(self.backup_dir, file)
+                stat = os.stat(path)
+                backups.append({"time": stat.st_mtime, "size": stat.st_size, "file": path})
+        return backups
+
+    @staticmethod
+    def _reachable(objects: Dict[str, dict], roots: List[str]) -> set:
+        reached = set()
+        stack = list(roots)
+        while stack:
+            blob_hash = stack.pop()
+            if blob_hash not in reached and blob_hash in objects:
+                reached.add(blob_hash)
+                stack.extend(objects[blob_hash]["children"])
+        return reached
+
+    def versions(self) -> List[dict]:
+        """Returns every version, newest first, each with its "time" (epoch seconds) and stored "size" in bytes"""
+        manifest = self._read_manifest()
+        objects = manifest["objects"]
+        versions = [
+            dict(version, size=sum(objects[blob]["size"] for blob in self._reachable(objects, [version["root"]])))
+            for version in manifest["versions"]
+        ]
+        return sorted(versions + self._legacy_backups(), key=lambda version: version["time"], reverse=True)
+
+    def _split(self, node: dict, blobs: Dict[str, tuple]) -> str:
+        """
+        Adds the content and child blob hashes of `node` and its child categories to `blobs`,
+        keyed by hash, and returns the hash of `node`
+        """
+        content = {}
+        children = []
+        for key, value in node.items():
+            if isinstance(value, dict) and not key.startswith("__") and not _is_item(value):
+                children.append(self._split(value, blobs))
+                value = {self.BLOB_REFERENCE: children[-1]}
+            content[key] = value
+        encoded = json.dumps(content, separators=(",", ":")).encode("utf-8")
+        blob_hash = hashlib.sha256(encoded).hexdigest()
+        blobs[blob_hash] = (encoded, children)
+        return blob_hash
+
+    def add_version(self, data: dict, max_versions: int) -> Optional[dict]:
+        """
+        Stores `data` as the newest version unless it equals the current newest one, then drops
+        the oldest versions beyond `max_versions`.
+        Returns:
+            Optional[dict]: The new version, or None when nothing changed.
+        """
+        blobs: Dict[str, tuple] = {}
+        root = self._split(data, blobs)
+        manifest = self._read_manifest()
+        if manifest["versions"] and manifest["versions"][-1]["root"] == root:
+            return None
+
+        objects = manifest["objects"]
+        for blob_hash, (encoded, children) in blobs.items():
+            if blob_hash in objects:
+                continue
+            path = self._object_path(blob_hash)
+            # Blobs written before an interrupted save are reused as they are
+            if not os.path.exists(path):
+                write_atomic(path, gzip.compress(encoded))
+            objects[blob_hash] = {"size": os.path.getsize(path), "children": children}
+
+        now = datetime.now()
+        version = {"time": now.timestamp(), "timestamp": now.isoformat(timespec="seconds"), "root": root}
+        manifest["versions"].append(version)
+        self._prune(manifest, max_versions)
+        write_atomic(self.manifest_path, json.dumps(manifest).encode("utf-8"))
+        self._collect_garbage(manifest)
+        return version
+
+    def _prune(self, manifest: dict, max_versions: int):
+        # Full-copy backups count towards the limit and are the first to go, being the oldest
+        legacy = sorted(self._legacy_backups(), key=lambda backup: backup["time"])
+        excess = len(manifest["versions"]) + len(legacy) - max_versions
+        for backup in legacy[: max(excess, 0)]:
+            os.remove(backup["file"])
+        excess -= len(legacy)
+        if excess > 0:
+            del manifest["versions"][:excess]
+
+    def _collect_garbage(self, manifest: dict):
+        """Removes the blobs no remaining version uses; runs after the manifest is written"""
+        used = self._reachable(manifest["objects"], [version["root"] for version in manifest["versions"]])
+        unused = [blob_hash for blob_hash in manifest["objects"] if blob_hash not in used]
+        if not unused:
+            return
+        for blob_hash in unused:
+            del manifest["objects"][blob_hash]
+            try:
+                os.remove(self._object_path(blob_hash))
+            except FileNotFoundError:
+                pass
+        write_atomic(self.manifest_path, json.dumps(manifest).encode("utf-8"))
+
+    def _load_blob(self, blob_hash: str) -> dict:
+        with gzip.open(self._object_path(blob_hash), "rt", encoding="utf-8") as f:
+            node = json.load(f)
+        for key, value in node.items():
+            if isinstance(value, dict) and self.BLOB_REFERENCE in value:
+                node[key] = self._load_blob(value[self.BLOB_REFERENCE])
+        return node
+
+    def load(self, version: dict) -> dict:
+        """Returns the list data of a version as returned by versions()"""
+        if "file" in version:
+            with gzip.open(version["file"], "rt", encoding="utf-8") as f:
+                return json.load(f)
+        return self._load_blob(version["root"])
+
+
+def journal_path(save_path: str) -> str:
+    """Returns where the edit journal of the save at `save_path` is kept"""
+    if save_path.endswith(SAVE_SUFFIX):
+        save_path = save_path[: -len(SAVE_SUFFIX)]
+    return save_path + JOURNAL_SUFFIX
+
+
+def history_path(save_path: str) -> str:
+    """Returns where the undo history of the save at `save_path` is kept, see UndoLog"""
+    directory, file_name = os.path.split(save_path)
+    if file_name.endswith(SAVE_SUFFIX):
+        file_name = file_name[: -len(SAVE_SUFFIX)]
+    return os.path.join(directory, HISTORY_DIRECTORY, file_name + HISTORY_SUFFIX)
+
+
+def content_hash(content: bytes) -> str:
+    """Returns a hash of a save file's snapshot as written, which names the list state it holds"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def _journal_header(base: str) -> bytes:
+    # Ties the journal to the snapshot it applies to, by its content_hash; a journal left over from an older
+    # snapshot is ignored
+    return json.dumps({"base": base}).encode("utf-8") + b"\n"
+
+
+def _child_keys(node: dict) -> List[str]:
+    return [key for key in node if not key.startswith("__")]
+
+
+def _place_child(node: dict, index: int, name: str, value: dict, replaces: Optional[str] = None):
+    """Puts `name` at child position `index` of `node`, after its metadata keys, optionally in place of `replaces`"""
+    children = [(key, node[key]) for key in _child_keys(node) if key != replaces and key != name]
+    children.insert(index, (name, value))
+    metadata = [(key, value) for key, value in node.items() if key.startswith("__")]
+    node.clear()
+    node.update(metadata + children)
+
+
+def _child(node: dict, name: str, row: Optional[int]) -> dict:
+    """Returns the child `name` of `node`, which has to be at child position `row` if one is given"""
+    if row is not None:
+        keys = _child_keys(node)
+        if not 0 <= row < len(keys) or keys[row] != name:
+            raise KeyError(f"{name} not found at row {row}")
+    return node[name]
+
+
+def apply_record(data: dict, record: dict):
+    """
+    Applies one edit journal record to list data in the save format. Records name the parent
+    of the changed entry by the path of names from the top of the list, and the rows of those
+    names and of the changed entry, which have to match:
+        {"op": "insert", "path": [...], "rows": [...], "index": 0, "name": "Item", "value": {...}}
+        {"op": "remove", "path": [...], "rows": [...], "name": "Item", "row": 0}
+        {"op": "replace", "path": [...], "rows": [...], "name": "Item", "row": 0, "new_name": "Item 2", "value": {...}}
+        {"op": "rename", "path": [...], "rows": [...], "name": "Item", "row": 0, "new_name": "Item 2"}
+        {"op": "move", "path": [...], "rows": [...], "name": "Item", "row": 0, "index": 1}
+        {"op": "set", "key": "__title", "value": ...}
+    Journals written before rows were recorded are applied by names alone.
+    Raises:
+        KeyError: If an entry is not where the record says; `data` is left unchanged then.
+    """
+    op = record["op"]
+    if op == "set":
+        data[record["key"]] = record["value"]
+        return
+
+    node = data
+    for name, row in zip(record["path"], record.get("rows") or [None] * len(record["path"])):
+        node = _child(node, name, row)
+    name = record["name"]
+    if op != "insert":
+        _child(node, name, record.get("row"))
+    if op == "insert":
+        _place_child(node, record["index"], name, record["value"])
+    elif op == "remove":
+        del node[name]
+    elif op in ("replace", "rename"):
+        index = _child_keys(node).index(name)
+        value = record["value"] if op == "replace" else node[name]
+        _place_child(node, index, record["new_name"], value, replaces=name)
+    elif op == "move":
+        _place_child(node, record["index"], name, node[name])
+    else:
+        raise ValueError(f"Unknown journal record: {op}")
+
+
+def load_save(save_path: str) -> Tuple[dict, int, str, bool]:
+    """
+    Reads a save and replays its edit journal onto it. A record cut off by a crash is left out,
+    and one that does not match the list ends the replay.
+    Records appended to a journal that is missing, belongs to an older snapshot (a crash between
+    writing the snapshot and its journal) or holds records that were not replayed would never be
+    replayed either, so the list needs a new snapshot before it is journaled again.
+    Returns:
+        Tuple[dict, int, str, bool]: The list data, the number of journal records replayed, the
+        content_hash of the snapshot they were replayed onto and whether records can be appended
+        to the journal.
+    """
+    with open(save_path, "rb") as f:
+        content = f.read()
+    data = json.loads(gzip.decompress(content))
+    base = content_hash(content)
+
+    replayed = 0
+    try:
+        with open(journal_path(save_path), "rb") as f:
+            lines = f.read().split(b"\n")
+    except FileNotFoundError:
+        return data, replayed, base, False
+    if lines[0] + b"\n" != _journal_header(base):
+        return data, replayed, base, False
+    # The last line is empty unless a record was cut off, which JournalJob drops before appending
+    records = lines[1:-1]
+    for line in records:
+        try:
+            apply_record(data, json.loads(line))
+        except (KeyError, ValueError):
+            break
+        replayed += 1
+    return data, replayed, base, replayed == len(records)
+
+
+class SaveJob:
+    """
+    A snapshot of one list to be written by the SaveWorker. Writing it starts a new, empty edit journal.
+    Attributes:
+        save_path (str): Location of the save file.
+        data (dict): The list data as returned by tree_to_dict. It must not be modified after submitting.
+        backup_dir (Optional[str]): Where to keep backups of the list, or None to skip them.
+        max_backups (int): Number of backup versions to keep in `backup_dir`.
+        undo_log (Optional[UndoLog]): Undo history of the list, checkpointed with the snapshot; a temporary
+            log is moved to the list's history_path first.
+        undo_records (List[dict]): The undo steps still in memory, which lead to `data`.
+    """
+
+    replaces_pending = True  # A snapshot makes every change queued before it redundant
+
+    def __init__(
+        self,
+        save_path: str,
+        data: dict,
+        backup_dir: Optional[str] = None,
+        max_backups: int = 5,
+        undo_log: Optional["UndoLog"] = None,
+        undo_records: Optional[List[dict]] = None,
+    ):
+        self.save_path = save_path
+        self.data = data
+        self.backup_dir = backup_dir
+        self.max_backups = max_backups
+        self.undo_log = undo_log
+        self.undo_records = undo_records or []
+        # The records follow on from the batches in the log now; see UndoLog.checkpoint
+        self.undo_version = undo_log.version if undo_log is not None else None
+        self.backup_version = None  # Set once a backup version was stored for this job
+        self.history_error: Optional[OSError] = None  # Set if the undo history could not be checkpointed
+
+    def run(self):
+        content = encode_save(self.data)
+        # Only lists that were saved before get a backup, and only when the content changed
+        if self.backup_dir and os.path.exists(self.save_path):
+            self.backup_version = BackupStore(self.backup_dir).add_version(self.data, self.max_backups)
+        write_atomic(self.save_path, content)
+        base = content_hash(content)
+        write_atomic(journal_path(self.save_path), _journal_header(base))
+        if self.undo_log is not None:
+            # The history is kept for the next session, so losing it does not fail the save
+            try:
+                if self.undo_log.temporary:
+                    self.undo_log.move(history_path(self.save_path))
+                self.undo_log.checkpoint(base, self.undo_records, self.undo_version)
+            except OSError as e:
+                self.history_error = e
+
+        file_name = os.path.basename(self.save_path)
+        if file_name.endswith(SAVE_SUFFIX):
+            update_index(
+                os.path.dirname(self.save_path), index_entry(file_name[: -len(SAVE_SUFFIX)], self.data, self.save_path)
+            )
+
+
+class JournalJob:
+    """
+    Edit journal records to append to a save's journal, see apply_record. Appending costs the same
+    however large the list is; the records are synced to disk before the job counts as done.
+    """
+
+    replaces_pending = False
+    backup_version = None
+
+    def __init__(self, save_path: str, records: List[dict]):
+        self.save_path = save_path
+        self.records = list(records)
+
+    def merge(self, job: "JournalJob"):
+        self.records += job.records
+
+    def run(self):
+        path = journal_path(self.save_path)
+        if not os.path.exists(path):
+            # Saves written before journals existed get one based on their current snapshot
+            with open(self.save_path, "rb") as f:
+                write_atomic(path, _journal_header(content_hash(f.read())))
+        with open(path, "r+b") as f:
+            # A record cut off by a crash would hide every record appended after it
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.seek(0)
+                f.truncate(f.read().rfind(b"\n") + 1)
+            f.seek(0, os.SEEK_END)
+            f.write(b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in self.records))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class UndoLog:
+    """
+    Undo history kept out of memory: batches of command records, each zlib compressed, stacked
+    in one binary file. The newest batch is read back first, as undo works backwards.
+    A checkpoint records the steps still in memory together with the content_hash of the snapshot
+    they lead to; SaveJob writes one with every snapshot. It is written as the last frame of the
+    file and replaced by the next one. When a list is reopened, its log is only used if the
+    checkpoint matches the snapshot loaded; the checkpoint's steps then become the newest batch,
+    so nothing is decompressed until the first undo.
+    Every frame is a header (kind, payload length, CRC-32 of the payload) followed by its payload.
+    The GUI thread pushes and pops while the save worker checkpoints, so every change holds a lock.
+    Example:
+        log = UndoLog.open(history_path(save_path), content_hash(content))
+        log.push([record1, record2])
+        records = log.pop()  # [record1, record2]
+        log.checkpoint(content_hash(content), in_memory_records)
+        log.close()
+    """
+
+    MAGIC = b"WLUNDO2\n"  # Version 1 records found their items by name alone and are not read
+    FRAME_HEADER = struct.Struct("<cII")
+    BATCH = b"B"
+    CHECKPOINT = b"C"
+    STATE_SIZE = 64  # Hex digest of the list state in checkpoint payloads
+
+    def __init__(self, path: Optional[str] = None):
+        """Starts an empty log at `path`, or in a temporary file that close() removes"""
+        self.temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="undo_", suffix=".log")
+            os.close(fd)
+        self.path = path
+        self.version = 0  # Counts the pushes, pops and clears, see checkpoint
+        self._offsets: List[int] = []  # Start of every batch in the file
+        self._checkpoint_offset: Optional[int] = None  # Start of the checkpoint written last, if still last
+        self._lock = threading.Lock()
+        self.clear()
+
+    @classmethod
+    def open(cls, path: str, state: str) -> "UndoLog":
+        """Opens the log at `path` if its checkpoint matches `state`, see content_hash; otherwise starts a new one"""
+        log = cls.__new__(cls)
+        log.temporary = False
+        log.path = path
+        log.version = 0
+        log._offsets = []
+        log._checkpoint_offset = None
+        log._lock = threading.Lock()
+        try:
+            log._scan(state)
+        except (OSError, ValueError):
+            log.clear()
+        return log
+
+    def _scan(self, state: str):
+        with open(self.path, "rb") as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError("not an undo log")
+            size = os.fstat(f.fileno()).st_size
+            offset = len(self.MAGIC)
+            frames = []
+            while offset < size:
+                header = f.read(self.FRAME_HEADER.size)
+                if len(header) < self.FRAME_HEADER.size:
+                    raise ValueError("truncated frame header")
+                kind, length, _ = self.FRAME_HEADER.unpack(header)
+                frames.append((kind, offset))
+                offset += self.FRAME_HEADER.size + length
+                f.seek(offset)
+            if offset != size or not frames or frames[-1][0] != self.CHECKPOINT:
+                raise ValueError("no checkpoint at the end of the log")
+            f.seek(frames[-1][1] + self.FRAME_HEADER.size)
+            if f.read(self.STATE_SIZE).decode("ascii") != state:
+                raise ValueError("the log belongs to another version of the list")
+        # Older checkpoints were all replaced, so every frame is a batch of the history now
+        self._offsets = [offset for _, offset in frames]
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _append(self, kind: bytes, payload: bytes) -> int:
+        self._drop_checkpoint()
+        with open(self.path, "ab") as f:
+            offset = os.path.getsize(self.path)
+            f.write(self.FRAME_HEADER.pack(kind, len(payload), zlib.crc32(payload)) + payload)
+        return offset
+
+    def _drop_checkpoint(self):
+        if self._checkpoint_offset is not None:
+            os.truncate(self.path, self._checkpoint_offset)
+            self._checkpoint_offset = None
+
+    def push(self, records: List[dict]):
+        payload = zlib.compress(json.dumps(records).encode("utf-8"))
+        with self._lock:
+            self._offsets.append(self._append(self.BATCH, payload))
+            self.version += 1
+
+    def pop(self) -> List[dict]:
+        """Removes the newest batch from the log and returns its records, oldest first"""
+        with self._lock:
+            self._drop_checkpoint()
+            start = self._offsets.pop()
+            self.version += 1
+            with open(self.path, "r+b") as f:
+                f.seek(start)
+                kind, length, checksum = self.FRAME_HEADER.unpack(f.read(self.FRAME_HEADER.size))
+                payload = f.read(length)
+                f.truncate(start)
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            raise ValueError("corrupt undo log")
+        if kind == self.CHECKPOINT:
+            payload = payload[self.STATE_SIZE :]
+        try:
+            return json.loads(zlib.decompress(payload))
+        except zlib.error as e:
+            raise ValueError(f"corrupt undo log: {e}")
+
+    def checkpoint(self, state: str, records: List[dict], version: Optional[int] = None) -> bool:
+        """
+        Records the steps still in memory and the list state they lead to, replacing the previous checkpoint.
+        Records taken at `version` follow on from the batches in the log then; if batches were pushed or
+        popped since, the checkpoint is skipped and False returned. The next snapshot writes a current one.
+        """
+        payload = state.encode("ascii") + zlib.compress(json.dumps(records).encode("utf-8"))
+        with self._lock:
+            if version is not None and version != self.version:
+                return False
+            self._checkpoint_offset = self._append(self.CHECKPOINT, payload)
+        return True
+
+    def move(self, path: str):
+        """Moves the log to `path`, where it stays after close()"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            shutil.move(self.path, path)
+            self.path = path
+            self.temporary = False
+
+    def clear(self):
+        with self._lock:
+            self._offsets.clear()
+            self._checkpoint_offset = None
+            self.version += 1
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "wb") as f:
+                f.write(self.MAGIC)
+
+    def close(self):
+        """
+        Forgets the log; a temporary log's file is removed, any other stays for the next session.
+        A snapshot still being written may checkpoint a log that is not temporary after it was closed.
+        """
+        with self._lock:
+            self._offsets.clear()
+            if self.temporary:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+
+
+class SaveWorker:
+    """
+    Writes save jobs on a background thread, in the order they were submitted. A snapshot replaces
+    the jobs of the same list still waiting, since only the newest one needs to reach the disk,
+    and journal records join the waiting journal job of their list.
+    `on_finished(job, error)` is called on the worker thread after every job, with the exception
+    that made it fail or None.
+    Example:
+        worker = SaveWorker(lambda job, error: print(job.save_path, error))
+        worker.submit(SaveJob("saves/list.json.gz", data))
+        worker.close()
+    """
+
+    def __init__(self, on_finished: Optional[Callable[[Union[SaveJob, JournalJob], Optional[Exception]], None]] = None):
+        self.on_finished = on_finished
+        self._pending: List[Union[SaveJob, JournalJob]] = []
+        self._busy = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="SaveWorker", daemon=True)
+        self._thread.start()
+
+    def submit(self, job: Union[SaveJob, JournalJob]):
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("SaveWorker is closed")
+            if job.replaces_pending:
+                self._pending = [pending for pending in self._pending if pending.save_path != job.save_path]
+            else:
+                last = self._pending[-1] if self._pending else None
+                if isinstance(last, JournalJob) and last.save_path == job.save_path:
+                    last.merge(job)
+                    return
+            self._pending.append(job)
+            self._condition.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every submitted job is written; returns False if `timeout` ran out first"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Writes the remaining job and stops the thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                job = self._pending.pop(0)
+                self._busy = True
+                self._condition.notify_all()
+
+            error = None
+            try:
+                job.run()
+            except Exception as e:
+                error = e
+
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+            if self.on_finished is not None:
+                self.on_finished(job, error)
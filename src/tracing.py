@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+from typing import List, Optional
+
+# The active tracer; None while tracing is disabled, which keeps span() down to one global lookup
+_tracer = None
+
+
+class Tracer:
+    """
+    Collects timed spans from any thread and exports them in the Chrome trace event format.
+    The exported JSON can be opened in chrome://tracing, Perfetto or speedscope.
+    Attributes:
+        events (List[dict]): Recorded complete ("X") events, timestamps in microseconds.
+    """
+
+    def __init__(self):
+        self.events: List[dict] = []
+        self.origin_ns = time.perf_counter_ns()
+        self.thread_names = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, category: str, start_ns: int, end_ns: int, args: Optional[dict] = None):
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start_ns - self.origin_ns) / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self.events.append(event)
+            self.thread_names.setdefault(thread.ident, thread.name)
+
+    def to_chrome_trace(self) -> dict:
+        with self._lock:
+            events = list(self.events)
+            thread_names = dict(self.thread_names)
+
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def summary(self) -> dict:
+        """Returns the total milliseconds and count of every span name"""
+        totals = {}
+        with self._lock:
+            for event in self.events:
+                total = totals.setdefault(event["name"], {"ms": 0.0, "count": 0})
+                total["ms"] += event["dur"] / 1000
+                total["count"] += 1
+        return totals
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start_ns")
+
+    def __init__(self, tracer: Tracer, name: str, category: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.category, self.start_ns, time.perf_counter_ns(), self.args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: str, cat: str = "pipeline", **args):
+    """
+    Returns a context manager timing the enclosed block as one span.
+    Example:
+        with tracing.span("get_category_members", "api", category=category):
+            ...
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, cat, args)
+
+
+def now() -> Optional[int]:
+    """Returns a timestamp for `record`, or None while tracing is disabled"""
+    return time.perf_counter_ns() if _tracer is not None else None
+
+
+def record(name: str, start_ns: Optional[int], cat: str = "pipeline", **args):
+    """Records a span from a `now()` timestamp taken earlier, possibly on another thread, until now"""
+    tracer = _tracer
+    if tracer is not None and start_ns is not None:
+        tracer.add(name, cat, start_ns, time.perf_counter_ns(), args)
+
+
+def is_enabled() -> bool:
+    return _tracer is not None
+
+
+def enable() -> Tracer:
+    """Starts collecting spans into a new tracer"""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable() -> Optional[Tracer]:
+    """Stops collecting spans and returns the tracer that was active"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
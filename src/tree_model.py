@@ -0,0 +1,355 @@
+from typing import Callable, List, Optional
+
+from PyQt6.QtCore import QAbstractItemModel, QModelIndex, Qt
+
+# Roles the model serves besides the name, kept from the item data roles of the former tree widget
+DESCRIPTION_ROLE = Qt.ItemDataRole.UserRole
+OPTIONS_ROLE = Qt.ItemDataRole.UserRole + 1
+TYPE_ROLE = Qt.ItemDataRole.UserRole + 2
+
+# Keys of list data that hold settings rather than entries
+RESERVED_KEYS = frozenset(("__metadata", "__options", "__title", "__collapsible"))
+
+# Nodes build_nodes creates between two progress reports
+PROGRESS_INTERVAL = 1000
+
+
+class DocumentNode:
+    """
+    One category, subcategory or item of a list. The nodes form the document tree the editor
+    works on: the tree view, saving and the preview all read it, and it only changes through
+    a TreeModel so the view hears about every change.
+    Every node also keeps its row among its siblings, which the changes below renumber, so the
+    view can find a node's index without searching its parent's children.
+    Every node keeps its serialization from to_dict until it or a node below it changes, so
+    saving and the preview only rebuild the dicts of the nodes on the paths to the changes and
+    share the rest with the previous serialization. Cached dicts must not be modified.
+    Attributes:
+        name (str): Text the node is shown and saved under.
+        type (Optional[str]): "category", "subcategory" or "item"; None for the root.
+        description (Optional[str]): Description of an item.
+        options (Optional[dict]): Options of a category or subcategory, e.g. {"extra_depth": 1}.
+        children (List[DocumentNode]): Child nodes in list order.
+        parent (Optional[DocumentNode]): Node the node is a child of; None for the root and detached nodes.
+    """
+
+    __slots__ = ("name", "type", "description", "options", "children", "parent", "_row", "_serialized")
+
+    def __init__(self, name: str = "", node_type: Optional[str] = None, description: Optional[str] = None):
+        self.name = name
+        self.type = node_type
+        self.description = description
+        self.options: Optional[dict] = None
+        self.children: List["DocumentNode"] = []
+        self.parent: Optional["DocumentNode"] = None
+        self._row = -1  # Position among the parent's children, only meaningful while the node has a parent
+        self._serialized: Optional[dict] = None  # Cached to_dict() result, None while the node is dirty
+
+    @property
+    def dirty(self) -> bool:
+        return self._serialized is None
+
+    def mark_dirty(self):
+        """Drops the cached serialization of the node and of every node above it"""
+        node = self
+        # A dirty node's ancestors are dirty already, as their serializations contain the node's
+        while node is not None and node._serialized is not None:
+            node._serialized = None
+            node = node.parent
+
+    def row(self) -> int:
+        """Position of the node among its parent's children, -1 if it is detached"""
+        if self.parent is None:
+            return -1
+        return self._row
+
+    def append(self, child: "DocumentNode"):
+        """Adds a child to a node the model does not show yet, e.g. while building a detached subtree"""
+        child.parent = self
+        child._row = len(self.children)
+        self.children.append(child)
+        self.mark_dirty()
+
+    def child_at(self, row: int, name: str) -> Optional["DocumentNode"]:
+        """Returns child `row` if it is named `name`; names alone can be ambiguous, as siblings may share one"""
+        if 0 <= row < len(self.children) and self.children[row].name == name:
+            return self.children[row]
+        return None
+
+    def path(self) -> List[str]:
+        """Returns the names leading from the top of the list down to this node, [] for the root"""
+        path = []
+        node = self
+        while node.parent is not None:
+            path.append(node.name)
+            node = node.parent
+        return path[::-1]
+
+    def path_rows(self) -> List[int]:
+        """Returns the rows of the nodes in path(), from the top down"""
+        rows = []
+        node = self
+        while node.parent is not None:
+            rows.append(node.row())
+            node = node.parent
+        return rows[::-1]
+
+    def names_unique(self) -> bool:
+        """Whether the children of this node and of every node above it all have different names"""
+        node = self
+        while node is not None:
+            if len({child.name for child in node.children}) != len(node.children):
+                return False
+            node = node.parent
+        return True
+
+    def to_dict(self, complete: bool = False) -> dict:
+        """
+        Returns the node and its children in the save format. With `complete`, categories keep
+        their description and items their options too, so from_dict can rebuild them exactly.
+        The result is cached, see mark_dirty; complete serializations are built fresh each time.
+        """
+        if not complete and self._serialized is not None:
+            return self._serialized
+
+        if not self.children and not complete:
+            # For leaf nodes (items)
+            self._serialized = {"__metadata": {"type": self.type}, "description": self.description}
+            return self._serialized
+
+        result = {"__metadata": {"type": self.type}}
+        if self.options:
+            result["__options"] = self.options
+        if complete:
+            result["description"] = self.description
+
+        for child in self.children:
+            result[child.name] = child.to_dict(complete)
+        if not complete:
+            self._serialized = result
+        return result
+
+    @classmethod
+    def from_dict(cls, name: str, value: dict) -> "DocumentNode":
+        """Builds a detached node and its children from their save format"""
+        node = cls(name, value.get("__metadata", {}).get("type", "category"), value.get("description"))
+        node.options = value.get("__options")
+        for key, child in value.items():
+            if isinstance(child, dict) and key not in ("__metadata", "__options"):
+                node.append(cls.from_dict(key, child))
+        return node
+
+
+def count_nodes(data: dict) -> int:
+    """Counts the entries of list data at every level, i.e. the nodes build_nodes makes of it"""
+    count = 0
+    pending = [data]
+    while pending:
+        for key, value in pending.pop().items():
+            if isinstance(value, dict) and key not in RESERVED_KEYS:
+                count += 1
+                pending.append(value)
+    return count
+
+
+def _renumber(children: List[DocumentNode], start: int = 0, stop: Optional[int] = None):
+    """Refreshes the cached rows of `children[start:stop]` after the list changed there"""
+    for row in range(start, len(children) if stop is None else stop):
+        children[row]._row = row
+
+
+def build_nodes(data: dict, progress: Optional[Callable[[int], bool]] = None) -> Optional[List[DocumentNode]]:
+    """
+    Builds detached nodes for the entries of list data (a save or any category in it) in one
+    pass, reading the dicts in place. Entries without metadata get no type, as in older saves.
+    `progress` is called with the number of nodes built so far every PROGRESS_INTERVAL nodes;
+    returning False cancels the build.
+    Returns:
+        Optional[List[DocumentNode]]: The top-level nodes, or None if the build was cancelled.
+    """
+    top = DocumentNode()
+    pending = [(top, data)]
+    built = 0
+    while pending:
+        parent, value = pending.pop()
+        children = parent.children
+        for key, child in value.items():
+            if not isinstance(child, dict) or key in RESERVED_KEYS:
+                continue
+            node = DocumentNode(key, None, child.get("description"))
+            if "__metadata" in child:
+                node.type = child["__metadata"].get("type", "category")
+            node.options = child.get("__options")
+            node.parent = parent
+            node._row = len(children)
+            children.append(node)
+            pending.append((node, child))
+
+            built += 1
+            if progress is not None and built % PROGRESS_INTERVAL == 0 and not progress(built):
+                return None
+
+    for node in top.children:
+        node.parent = None
+    return top.children
+
+
+class TreeModel(QAbstractItemModel):
+    """
+    Item model over a DocumentNode tree, with one column showing the node names. Indexes point
+    at their node directly, so the view never needs a copy of the list. All changes go through
+    the methods below, which keep the tree and the view in step.
+    Example:
+        model = TreeModel()
+        view.setModel(model)
+        model.insert_node(model.root, 0, DocumentNode("New Category", "category"))
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.root = DocumentNode()
+
+    def node(self, index: QModelIndex) -> DocumentNode:
+        """Returns the node of an index, the root for an invalid one"""
+        return index.internalPointer() if index.isValid() else self.root
+
+    def index_of(self, node: DocumentNode, column: int = 0) -> QModelIndex:
+        """Returns the index of a node in the model, an invalid one for the root"""
+        if node is self.root or node.parent is None:
+            return QModelIndex()
+        return self.createIndex(node.row(), column, node)
+
+    # QAbstractItemModel interface
+
+    def index(self, row, column, parent=QModelIndex()):
+        children = self.node(parent).children
+        if column != 0 or not 0 <= row < len(children):
+            return QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        return self.index_of(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        return bool(self.node(parent).children)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return node.name
+        if role == DESCRIPTION_ROLE:
+            return node.description
+        if role == OPTIONS_ROLE:
+            return node.options
+        if role == TYPE_ROLE:
+            return node.type
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole and section == 0:
+            return "Items"
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    # Changes
+
+    def insert_node(self, parent: DocumentNode, row: int, node: DocumentNode):
+        """Inserts a detached node, with its children, as child `row` of `parent`"""
+        self.insert_nodes(parent, row, [node])
+
+    def insert_nodes(self, parent: DocumentNode, row: int, nodes: List[DocumentNode]):
+        """Inserts detached nodes as children of `parent` from `row` on, telling the view once for all of them"""
+        if not nodes:
+            return
+        self.beginInsertRows(self.index_of(parent), row, row + len(nodes) - 1)
+        for node in nodes:
+            node.parent = parent
+        parent.children[row:row] = nodes
+        _renumber(parent.children, row)
+        parent.mark_dirty()
+        self.endInsertRows()
+
+    def append_node(self, parent: DocumentNode, node: DocumentNode):
+        self.insert_node(parent, len(parent.children), node)
+
+    def take_node(self, node: DocumentNode) -> int:
+        """Removes a node, with its children, from the tree and returns the row it was at"""
+        parent = node.parent
+        row = node.row()
+        self.beginRemoveRows(self.index_of(parent), row, row)
+        del parent.children[row]
+        node.parent = None
+        _renumber(parent.children, row)
+        parent.mark_dirty()
+        self.endRemoveRows()
+        return row
+
+    def move_node(self, node: DocumentNode, row: int):
+        """Moves a node to position `row` among its siblings"""
+        parent = node.parent
+        old_row = node.row()
+        if row == old_row:
+            return
+        parent_index = self.index_of(parent)
+        # Qt counts the destination before the node is taken out
+        self.beginMoveRows(parent_index, old_row, old_row, parent_index, row + 1 if row > old_row else row)
+        del parent.children[old_row]
+        parent.children.insert(row, node)
+        _renumber(parent.children, min(row, old_row), max(row, old_row) + 1)
+        parent.mark_dirty()
+        self.endMoveRows()
+
+    def update_node(self, node: DocumentNode, **fields):
+        """Sets the given fields (name, description, options, type) of a node"""
+        for field, value in fields.items():
+            setattr(node, field, value)
+        node.mark_dirty()
+        index = self.index_of(node)
+        if index.isValid():
+            self.dataChanged.emit(index, index)
+
+    def sort_children(self, parent: DocumentNode, key: Callable[[DocumentNode], str], reverse=False, recursive=False):
+        """Sorts the children of `parent`, and with `recursive` those of all nodes below it, keeping the view's state"""
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        old_nodes = [index.internalPointer() for index in old_indexes]
+
+        pending = [parent]
+        while pending:
+            node = pending.pop()
+            node.children.sort(key=key, reverse=reverse)
+            _renumber(node.children)
+            node.mark_dirty()
+            if recursive:
+                pending.extend(child for child in node.children if child.children)
+
+        new_indexes = [
+            self.createIndex(node.row(), index.column(), node) for index, node in zip(old_indexes, old_nodes)
+        ]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def clear(self):
+        """Removes every node"""
+        self.beginResetModel()
+        for node in self.root.children:
+            node.parent = None
+        self.root.children = []
+        self.root.mark_dirty()
+        self.endResetModel()
@@ -1,8 +1,8 @@
 import os
-import gzip
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
+    QTreeView,
     QTreeWidget,
     QTreeWidgetItem,
     QPushButton,
@@ -24,24 +24,64 @@ from PyQt6.QtWidgets import (
     QHeaderView,
     QMenu,
     QGroupBox,
+    QProgressDialog,
 )
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QIcon, QAction
+from PyQt6.QtCore import Qt, QTimer, QBuffer, QByteArray, QUrl, pyqtSignal
+from PyQt6.QtGui import QIcon, QAction, QDesktopServices
 from list_builder import ManualListBuilder
 from datetime import datetime
 from colorama import init, Fore, Style
 import qdarktheme
 import json
 import ctypes
+import time
 import uuid  # Add this import at the top with other imports
+from PyQt6.QtWebEngineCore import (
+    QWebEnginePage,
+    QWebEngineProfile,
+    QWebEngineUrlRequestJob,
+    QWebEngineUrlScheme,
+    QWebEngineUrlSchemeHandler,
+)
 from PyQt6.QtWebEngineWidgets import QWebEngineView
-from html_converter import create_html_page, wiki_to_html_table
+from asset_bundle import ASSET_HOST, ASSET_SCHEME, AssetBundle
+from html_converter import (
+    create_preview_shell,
+    preview_patch_script,
+    virtual_preview_script,
+    wiki_to_html_blocks,
+)
+from save_store import (
+    BackupStore,
+    JournalJob,
+    SaveJob,
+    SaveWorker,
+    UndoLog,
+    history_path,
+    journal_path,
+    load_index,
+    load_save,
+    remove_from_index,
+)
+from tree_model import DocumentNode, TreeModel, build_nodes, count_nodes
 
 init()
 
 
 LOG_LEVELS = {"INFO": Fore.GREEN, "WARNING": Fore.YELLOW, "ERROR": Fore.RED, "DEBUG": Fore.CYAN}
 
+# Edits arriving within this many milliseconds of a scheduled preview refresh share it
+PREVIEW_REFRESH_MS = 50
+
+# Journal records after which the next save writes a full snapshot instead
+JOURNAL_COMPACT_RECORDS = 500
+
+# Modifications of the same item and field less than this many seconds apart are undone together
+UNDO_MERGE_SECONDS = 1.5
+
+# Lists with at least this many entries show a cancellable progress dialog while loading
+LOAD_PROGRESS_NODES = 20_000
+
 
 def log(msg, level="INFO"):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -268,28 +308,16 @@ class SaveSelectionDialog(QDialog):
 
         if os.path.exists(saves_dir):
             save_items = []
-            for file in os.listdir(saves_dir):
-                if file.endswith(".json.gz"):
-                    try:
-                        file_path = os.path.join(saves_dir, file)
-                        timestamp = datetime.fromtimestamp(os.path.getmtime(file_path))
-
-                        with gzip.open(file_path, "rt", encoding="utf-8") as f:
-                            data = json.load(f)
-                            title = data.get("__title", "Untitled")
-                            if isinstance(title, (list, dict)):
-                                if isinstance(title, list):
-                                    display_title = title[0]["title"] if isinstance(title[0], dict) else title[0]
-                                else:
-                                    display_title = title["title"]
-                            else:
-                                display_title = str(title)
-
-                            save_id = file[:-8]  # Remove .json.gz
-                            self.save_data[display_title] = {"id": save_id, "timestamp": timestamp}
-                            save_items.append((display_title, timestamp))
-                    except Exception as e:
-                        log(f"Error loading save {file}: {e}", "ERROR")
+            # The index only has to read saves that changed since it was last written
+            try:
+                entries = load_index(saves_dir)
+            except Exception as e:
+                log(f"Error loading save index: {e}", "ERROR")
+                entries = []
+            for entry in entries:
+                timestamp = datetime.fromtimestamp(entry["mtime"])
+                self.save_data[entry["title"]] = {"id": entry["id"], "timestamp": timestamp}
+                save_items.append((entry["title"], timestamp))
 
             # Add items to table
             self.saves_table.setRowCount(len(save_items))
@@ -320,6 +348,11 @@ class SaveSelectionDialog(QDialog):
                     file_path = os.path.join("saves", f"{save_data['id']}.json.gz")
                     try:
                         os.remove(file_path)
+                        # The list's edit journal and undo history go with it
+                        for path in (journal_path(file_path), history_path(file_path)):
+                            if os.path.exists(path):
+                                os.remove(path)
+                        remove_from_index("saves", save_data["id"])
                         self.saves_table.removeRow(current_row)
                         self.save_data.pop(display_name, None)
                     except Exception as e:
@@ -354,55 +387,240 @@ class Command:
 
 
 class TreeCommand(Command):
-    def __init__(self, description, tree_widget, action_type, item=None, parent=None, old_data=None, new_data=None):
+    def __init__(self, description, tree_model, action_type, item=None, parent=None, old_data=None, new_data=None):
         super().__init__(description)
-        self.tree = tree_widget
+        self.model = tree_model
         self.action_type = action_type
-        self.item = item
-        self.parent = parent
+        self.item = item  # DocumentNode the command changes
+        self.parent = parent  # Node an added or removed item goes into or comes from, the model's root at the top
         self.old_data = old_data
         self.new_data = new_data
-        self.old_index = None if not item else (parent or tree_widget.invisibleRootItem()).indexOfChild(item)
+        self.old_index = None if not item else item.row()
+        self.removed_row = None  # Row the last do() or undo() took the item from, if it took it out
+        self.timestamp = time.monotonic()
+        self.location = None  # Parent path and rows, name and row of the item after do(), see locate()
+        self.size = 0  # Estimated memory use, set when the command enters the undo history
+
+    @classmethod
+    def from_record(cls, tree_model, record):
+        """Rebuilds a command written by to_record, with the tree as it was right after the command was done"""
+        # Siblings may share a name, so every node is found by its row and checked by its name
+        parent = tree_model.root
+        for name, row in zip(record["path"], record["rows"]):
+            parent = parent.child_at(row, name)
+            if parent is None:
+                raise KeyError(f"{name} not found at row {row}")
+
+        action_type = record["action"]
+        if action_type == "remove":
+            item = DocumentNode.from_dict(record["name"], record["value"])
+        else:
+            item = parent.child_at(record["row"], record["name"])
+            if item is None:
+                raise KeyError(f"{record['name']} not found at row {record['row']}")
+
+        command = cls(
+            record["description"],
+            tree_model,
+            action_type,
+            item,
+            parent if action_type in ("add", "remove") else None,
+            old_data=record["old_data"],
+            new_data=record["new_data"],
+        )
+        if action_type == "remove":
+            command.old_index = record["index"]
+        return command
+
+    def to_record(self):
+        """Describes the command by names and values only, for the undo log; the command must be done and located"""
+        path, rows, name, row = self.location
+        record = {
+            "description": self.description,
+            "action": self.action_type,
+            "path": path,
+            "rows": rows,
+            "name": name,
+            "row": row,
+            "old_data": self.old_data,
+            "new_data": self.new_data,
+            "size": self.size,
+        }
+        if self.action_type == "remove":
+            record["index"] = self.old_index
+            record["value"] = self.item.to_dict(complete=True)
+        return record
+
+    def locate(self):
+        """Remembers where the item is after do(), which is where from_record finds it again"""
+        parent = self.parent if self.action_type in ("add", "remove") else self.item.parent or self.model.root
+        row = self.old_index if self.action_type == "remove" else self.item.row()
+        self.location = (parent.path(), parent.path_rows(), self.item.name, row)
+
+    def memory_size(self):
+        """Rough number of bytes the command keeps alive"""
+        size = 200
+        for data in (self.old_data, self.new_data):
+            if data:
+                size += sum(len(str(value)) for value in data.values())
+        if self.action_type in ("add", "remove"):
+            size += len(json.dumps(self.item.to_dict()))
+        return size
+
+    def merge(self, command):
+        """Folds a following modification of the same item and field into this command, if it is one"""
+        if (
+            self.action_type != "modify"
+            or command.action_type != "modify"
+            or command.item is not self.item
+            or command.description != self.description
+            or command.timestamp - self.timestamp > UNDO_MERGE_SECONDS
+        ):
+            return False
+        self.new_data = command.new_data
+        self.timestamp = command.timestamp
+        self.location = command.location
+        return True
 
     def do(self):
         if self.action_type == "add":
-            if self.parent:
-                self.parent.addChild(self.item)
-            else:
-                self.tree.addTopLevelItem(self.item)
+            self.model.append_node(self.parent, self.item)
         elif self.action_type == "remove":
-            if self.parent:
-                self.parent.takeChild(self.parent.indexOfChild(self.item))
-            else:
-                self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(self.item))
+            self.removed_row = self.model.take_node(self.item)
         elif self.action_type == "modify":
-            self.item.setText(0, self.new_data.get("text", ""))
-            self.item.setData(0, Qt.ItemDataRole.UserRole, self.new_data.get("description", ""))
+            self.model.update_node(
+                self.item, name=self.new_data.get("text", ""), description=self.new_data.get("description", "")
+            )
         elif self.action_type == "move":
-            current_parent = self.item.parent() or self.tree.invisibleRootItem()
-            current_index = current_parent.indexOfChild(self.item)
-            current_parent.takeChild(current_index)
             if self.new_data["index"] >= 0:
-                current_parent.insertChild(self.new_data["index"], self.item)
+                self.model.move_node(self.item, self.new_data["index"])
+            else:
+                self.removed_row = self.model.take_node(self.item)
 
     def undo(self):
         if self.action_type == "add":
-            if self.parent:
-                self.parent.takeChild(self.parent.indexOfChild(self.item))
-            else:
-                self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(self.item))
+            self.removed_row = self.model.take_node(self.item)
         elif self.action_type == "remove":
-            if self.parent:
-                self.parent.insertChild(self.old_index, self.item)
-            else:
-                self.tree.insertTopLevelItem(self.old_index, self.item)
+            self.model.insert_node(self.parent, self.old_index, self.item)
         elif self.action_type == "modify":
-            self.item.setText(0, self.old_data.get("text", ""))
-            self.item.setData(0, Qt.ItemDataRole.UserRole, self.old_data.get("description", ""))
+            self.model.update_node(
+                self.item, name=self.old_data.get("text", ""), description=self.old_data.get("description", "")
+            )
         elif self.action_type == "move":
-            current_parent = self.item.parent() or self.tree.invisibleRootItem()
-            current_parent.takeChild(current_parent.indexOfChild(self.item))
-            current_parent.insertChild(self.old_data["index"], self.item)
+            if self.item.parent is not None:
+                self.model.move_node(self.item, self.old_data["index"])
+            else:
+                self.model.insert_node(self.model.root, self.old_data["index"], self.item)
+
+    def journal_record(self, undone=False):
+        """
+        Describes the change made by the last do(), or undo() if `undone`, as an edit journal record.
+        Returns None when the change involves siblings sharing a name: the save format is keyed by
+        name and holds only one of them, so no record can address the right one and a snapshot has
+        to be saved instead.
+        """
+        if self.action_type in ("add", "remove"):
+            inserted = (self.action_type == "add") != undone
+            if not self.parent.names_unique():
+                return None
+            if not inserted and any(child.name == self.item.name for child in self.parent.children):
+                # The item shared its name with a sibling, whose entry the saved one was
+                return None
+            if self.parent is not self.model.root and len(self.parent.children) == (1 if inserted else 0):
+                # The parent turned from an item into a category or back, which changes its own entry
+                name = self.parent.name
+                return {
+                    "op": "replace",
+                    **self.parent_location(self.parent.parent),
+                    "name": name,
+                    "row": self.parent.row(),
+                    "new_name": name,
+                    "value": self.parent.to_dict(),
+                }
+            if not inserted:
+                return {
+                    "op": "remove",
+                    **self.parent_location(self.parent),
+                    "name": self.item.name,
+                    "row": self.removed_row,
+                }
+            return {
+                "op": "insert",
+                **self.parent_location(self.parent),
+                "index": self.item.row(),
+                "name": self.item.name,
+                "value": self.item.to_dict(),
+            }
+
+        parent = self.item.parent or self.model.root
+        if not parent.names_unique():
+            return None
+        location = self.parent_location(parent)
+        if self.action_type == "modify":
+            old_data, new_data = (self.new_data, self.old_data) if undone else (self.old_data, self.new_data)
+            old_name = old_data.get("text", "")
+            if old_name != new_data.get("text", "") and any(child.name == old_name for child in parent.children):
+                # The old name is still taken by a sibling, so the saved entry was that sibling's
+                return None
+            names = {**location, "name": old_name, "row": self.item.row(), "new_name": new_data.get("text", "")}
+            if self.item.children:
+                return {"op": "rename", **names}
+            return {"op": "replace", **names, "value": self.item.to_dict()}
+
+        # Moves
+        old_row = (self.new_data if undone else self.old_data)["index"]
+        if self.item.parent is None:
+            if any(child.name == self.item.name for child in parent.children):
+                return None
+            return {"op": "remove", **location, "name": self.item.name, "row": self.removed_row}
+        return {"op": "move", **location, "name": self.item.name, "row": old_row, "index": self.item.row()}
+
+    @staticmethod
+    def parent_location(parent):
+        return {"path": parent.path(), "rows": parent.path_rows()}
+
+
+class PreviewPage(QWebEnginePage):
+    """Opens clicked links in the browser so the preview shell is never navigated away from"""
+
+    def acceptNavigationRequest(self, url, navigation_type, is_main_frame):
+        if navigation_type == QWebEnginePage.NavigationType.NavigationTypeLinkClicked:
+            QDesktopServices.openUrl(url)
+            return False
+        return super().acceptNavigationRequest(url, navigation_type, is_main_frame)
+
+
+class AssetSchemeHandler(QWebEngineUrlSchemeHandler):
+    """Serves the locally bundled preview assets from memory"""
+
+    def __init__(self, bundle, parent=None):
+        super().__init__(parent)
+        self.bundle = bundle
+
+    def requestStarted(self, job):
+        asset = self.bundle.get(job.requestUrl().path())
+        if asset is None:
+            job.fail(QWebEngineUrlRequestJob.Error.UrlNotFound)
+            return
+
+        data, content_type = asset
+        # The buffer is parented to the job so it lives exactly as long as the request
+        buffer = QBuffer(job)
+        buffer.setData(QByteArray(data))
+        buffer.open(QBuffer.OpenModeFlag.ReadOnly)
+        job.reply(content_type.encode(), buffer)
+
+
+def register_asset_scheme():
+    """Registers the bundled asset URL scheme; must run before the QApplication is created"""
+    scheme = QWebEngineUrlScheme(ASSET_SCHEME.encode())
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    scheme.setFlags(
+        QWebEngineUrlScheme.Flag.SecureScheme
+        | QWebEngineUrlScheme.Flag.LocalAccessAllowed
+        | QWebEngineUrlScheme.Flag.CorsEnabled
+    )
+    QWebEngineUrlScheme.registerScheme(scheme)
 
 
 class SettingsDialog(QDialog):
@@ -436,7 +654,14 @@ class SettingsDialog(QDialog):
         self.auto_save_checkbox = QCheckBox("Enable auto-save")
         self.auto_save_checkbox.setChecked(True)
 
+        self.auto_save_interval_spinner = QSpinBox()
+        self.auto_save_interval_spinner.setRange(1, 600)
+        self.auto_save_interval_spinner.setSuffix(" s")
+        self.auto_save_interval_spinner.setValue(2)
+
         auto_save_layout.addWidget(self.auto_save_checkbox)
+        auto_save_layout.addWidget(QLabel("Save at most every:"))
+        auto_save_layout.addWidget(self.auto_save_interval_spinner)
         auto_save_group.setLayout(auto_save_layout)
         layout.addWidget(auto_save_group)
 
@@ -467,6 +692,34 @@ class SettingsDialog(QDialog):
         backup_group.setLayout(backup_layout)
         layout.addWidget(backup_group)
 
+        # Preview Section
+        preview_group = QGroupBox("Preview")
+        preview_layout = QVBoxLayout()
+
+        self.virtual_rows_spinner = QSpinBox()
+        self.virtual_rows_spinner.setRange(100, 1_000_000)
+        self.virtual_rows_spinner.setSingleStep(500)
+        self.virtual_rows_spinner.setValue(2000)
+
+        preview_layout.addWidget(QLabel("Only render visible rows for tables with at least this many rows:"))
+        preview_layout.addWidget(self.virtual_rows_spinner)
+        preview_group.setLayout(preview_layout)
+        layout.addWidget(preview_group)
+
+        # Undo History Section
+        history_group = QGroupBox("Undo History")
+        history_layout = QVBoxLayout()
+
+        self.undo_memory_spinner = QSpinBox()
+        self.undo_memory_spinner.setRange(1, 1024)
+        self.undo_memory_spinner.setSuffix(" MB")
+        self.undo_memory_spinner.setValue(16)
+
+        history_layout.addWidget(QLabel("Memory for undo steps before older ones move to disk:"))
+        history_layout.addWidget(self.undo_memory_spinner)
+        history_group.setLayout(history_layout)
+        layout.addWidget(history_group)
+
         # Buttons
         button_box = QHBoxLayout()
         save_btn = QPushButton("Save")
@@ -540,23 +793,17 @@ class BackupManagerDialog(QDialog):
         if not os.path.exists(backup_dir):
             return
 
-        backups = []
-        for file in os.listdir(backup_dir):
-            if file.startswith("backup_") and file.endswith(".json.gz"):
-                path = os.path.join(backup_dir, file)
-                timestamp = datetime.fromtimestamp(os.path.getmtime(path))
-                size = os.path.getsize(path)
-                backups.append((timestamp, size, path))
-
-        # Sort backups by timestamp (newest first)
-        backups.sort(reverse=True)
+        # Versions come newest first; their size counts the blobs they share with other versions too
+        self.backup_store = BackupStore(backup_dir)
+        versions = self.backup_store.versions()
 
         # Add to table
-        self.backup_table.setRowCount(len(backups))
-        for row, (timestamp, size, path) in enumerate(backups):
+        self.backup_table.setRowCount(len(versions))
+        for row, version in enumerate(versions):
+            timestamp = datetime.fromtimestamp(version["time"])
             date_item = QTableWidgetItem(timestamp.strftime("%Y-%m-%d %H:%M:%S"))
-            size_item = QTableWidgetItem(f"{size / 1024:.1f} KB")
-            date_item.setData(Qt.ItemDataRole.UserRole, path)
+            size_item = QTableWidgetItem(f"{version['size'] / 1024:.1f} KB")
+            date_item.setData(Qt.ItemDataRole.UserRole, version)
 
             self.backup_table.setItem(row, 0, date_item)
             self.backup_table.setItem(row, 1, size_item)
@@ -593,14 +840,13 @@ class BackupManagerDialog(QDialog):
             return
 
         self.restore_btn.setEnabled(True)
-        path = selected_items[0].data(Qt.ItemDataRole.UserRole)
+        version = selected_items[0].data(Qt.ItemDataRole.UserRole)
 
         try:
-            with gzip.open(path, "rt", encoding="utf-8") as f:
-                data = json.load(f)
-                # Clean the data before showing preview
-                cleaned_data = self.clean_data_for_preview(data)
-                self.preview.setText(json.dumps(cleaned_data, indent=2))
+            data = self.backup_store.load(version)
+            # Clean the data before showing preview
+            cleaned_data = self.clean_data_for_preview(data)
+            self.preview.setText(json.dumps(cleaned_data, indent=2))
         except Exception as e:
             self.preview.setText(f"Error loading backup: {e}")
 
@@ -617,30 +863,40 @@ class BackupManagerDialog(QDialog):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            path = selected_items[0].data(Qt.ItemDataRole.UserRole)
+            version = selected_items[0].data(Qt.ItemDataRole.UserRole)
             try:
-                with gzip.open(path, "rt", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.parent.loading_list = True
-                    self.parent.clear_list(add_category=False)
-                    self.parent.load_tree_data(data)
-                    self.parent.loading_list = False
-                    self.parent.update_preview()
-                    self.accept()
+                data = self.backup_store.load(version)
+                self.parent.loading_list = True
+                self.parent.clear_list(add_category=False)
+                self.parent.load_tree_data(data)
+                self.parent.loading_list = False
+                self.parent.update_preview()
+                self.accept()
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Could not restore backup: {e}")
 
 
 class WikiListBuilder(QMainWindow):
+    save_finished = pyqtSignal(object, object)
+
     def __init__(self, skip_initial_load=False):
         super().__init__()
         self.auto_save_enabled = True
-        self.undo_stack = []
+        self.undo_stack = []  # Newest last; entries are TreeCommands or records of commands read back from the undo log
         self.redo_stack = []
+        self.undo_log = UndoLog()  # Older undo history, moved out of memory
+        self.undo_memory = 0  # Estimated bytes held by undo_stack
         self.current_save_name = None  # Track current save name
         self.loading_list = False  # Add flag to track when we're loading a list
         self.target_save_name = None  # Add new variable to track target save name
         self.save_id = None  # Add save_id to track the unique identifier
+        self.preview_ready = False  # The preview shell page has finished loading
+        self.pending_preview_script = None  # Update waiting for the shell to load
+        self.last_preview_script = None  # Update currently shown in the preview
+        self.save_pending = False  # There are edits the next auto-save has to write
+        self.pending_records = []  # Edit journal records waiting for the next auto-save
+        self.snapshot_needed = True  # The saved snapshot and journal no longer describe the list
+        self.journal_length = 0  # Records in the journal since the last snapshot
 
         self.settings = {
             "save_directory": os.path.abspath("saves"),
@@ -648,9 +904,27 @@ class WikiListBuilder(QMainWindow):
             "default_collapsible": False,
             "max_backups": 5,  # New setting for maximum number of backups per save
             "backup_enabled": True,  # New setting to enable/disable backups
+            "virtual_preview_rows": 2000,  # Tables with this many rows only render the visible rows
+            "auto_save_interval": 2,  # Seconds between auto-saves while editing
+            "undo_memory_mb": 16,  # Undo history kept in memory before older steps move to disk
         }
         self.load_settings()
 
+        # Edits only schedule the preview refresh and the save, so a burst of keystrokes
+        # costs one refresh per PREVIEW_REFRESH_MS and one save per auto_save_interval
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_REFRESH_MS)
+        self.preview_timer.timeout.connect(self.update_preview)
+
+        self.save_timer = QTimer(self)
+        self.save_timer.setSingleShot(True)
+        self.save_timer.timeout.connect(self.auto_save)
+
+        # The worker calls back on its own thread; the signal hands the result to the GUI thread
+        self.save_finished.connect(self.on_save_finished)
+        self.save_worker = SaveWorker(self.save_finished.emit)
+
         # Create saves directory if it doesn't exist
         os.makedirs(self.settings["save_directory"], exist_ok=True)
 
@@ -690,14 +964,18 @@ class WikiListBuilder(QMainWindow):
         # Add collapsible checkbox after title input
         collapsible_layout = QHBoxLayout()
         self.collapsible_checkbox = QCheckBox("Collapsible")
-        self.collapsible_checkbox.stateChanged.connect(self.update_preview)
+        self.collapsible_checkbox.stateChanged.connect(self.on_collapsible_changed)
         collapsible_layout.addWidget(self.collapsible_checkbox)
         left_layout.addLayout(collapsible_layout)
 
-        # Tree widget (now after title input)
-        self.tree = QTreeWidget()
-        self.tree.setHeaderLabels(["Items"])
-        self.tree.itemSelectionChanged.connect(self.on_selection_changed)
+        # Tree view of the list document (now after title input)
+        self.model = TreeModel(self)
+        self.tree = QTreeView()
+        self.tree.setModel(self.model)
+        self.tree.setUniformRowHeights(True)  # Lets the view lay out huge lists without measuring every row
+        self.tree.selectionModel().currentChanged.connect(self.on_selection_changed)
+        # Resetting the model drops the current item without reporting it
+        self.model.modelReset.connect(self.on_selection_changed)
         self.tree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.show_context_menu)
         left_layout.addWidget(self.tree)
@@ -770,25 +1048,23 @@ class WikiListBuilder(QMainWindow):
         html_label = QLabel("HTML Preview:")
         html_label.setMaximumHeight(20)  # Limit label height
         self.web_view = QWebEngineView()
+        self.web_view.setPage(PreviewPage(self.web_view))
         self.web_view.setMinimumHeight(100)
 
-        # Set initial blank page with background color
-        blank_html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {
-                    margin: 0;
-                    padding: 0;
-                    background-color: #202124;
-                }
-            </style>
-        </head>
-        <body></body>
-        </html>
-        """
-        self.web_view.setHtml(blank_html)
+        # Serve the head's scripts and stylesheets locally when a bundle has been built; the
+        # ResourceLoader modules and stylesheet url() assets they pull in still need the network
+        self.asset_bundle = AssetBundle.load()
+        if self.asset_bundle is not None:
+            self.asset_handler = AssetSchemeHandler(self.asset_bundle, self)
+            QWebEngineProfile.defaultProfile().installUrlSchemeHandler(ASSET_SCHEME.encode(), self.asset_handler)
+        else:
+            log("No local asset bundle found, the preview loads its assets from the network", "WARNING")
+
+        # Load the preview shell once; tables are patched into it by update_preview.
+        # setContent is bound by the same 2 MB limit as setHtml, so tables must not be inlined here
+        self.web_view.loadFinished.connect(self.on_preview_loaded)
+        base_url = QUrl(f"{ASSET_SCHEME}://{ASSET_HOST}/") if self.asset_bundle is not None else QUrl()
+        self.web_view.setContent(create_preview_shell(self.asset_bundle), "text/html;charset=UTF-8", base_url)
 
         html_layout.addWidget(html_label)
         html_layout.addWidget(self.web_view, 1)  # Add stretch factor
@@ -857,7 +1133,7 @@ class WikiListBuilder(QMainWindow):
 
         save_action = QAction("Save", self)
         save_action.setShortcut("Ctrl+S")
-        save_action.triggered.connect(self.auto_save)
+        save_action.triggered.connect(lambda: self.auto_save(compact=True))
 
         export_action = QAction("Export...", self)
         export_action.setShortcut("Ctrl+E")
@@ -942,125 +1218,155 @@ class WikiListBuilder(QMainWindow):
         title = self.list_title_input.text().split("|")[0].strip()
         return "".join(c for c in title if c.isalnum() or c in (" ", "-", "_")).rstrip()
 
-    def auto_save(self):
-        """Automatically save the current state"""
+    def schedule_preview(self):
+        """Refresh the preview once the current burst of edits has been handled"""
+        if not self.preview_timer.isActive():
+            self.preview_timer.start()
+
+    def schedule_save(self):
+        """Mark the list as changed and save a snapshot of it at the end of the auto-save interval"""
+        self.snapshot_needed = True
+        self.schedule_journal()
+
+    def schedule_journal(self, record=None):
+        """Queue an edit journal record, see save_store.apply_record, for the next auto-save"""
+        if record is not None:
+            self.pending_records.append(record)
+        self.save_pending = True
+        if not self.save_timer.isActive():
+            self.save_timer.start(self.settings["auto_save_interval"] * 1000)
+
+    def journal_command(self, command, undone=False):
+        """Queues the journal record of a command just done or undone, or a snapshot if no record can describe it"""
+        record = command.journal_record(undone)
+        if record is None:
+            self.schedule_save()
+        else:
+            self.schedule_journal(record)
+
+    def schedule_update(self):
+        self.schedule_preview()
+        self.schedule_save()
+
+    def flush_pending_save(self):
+        """Write scheduled changes now and fold the journal into a snapshot, before the list is replaced or closed"""
+        if self.save_pending or self.journal_length:
+            self.auto_save(compact=True)
+
+    def closeEvent(self, event):
+        self.preview_timer.stop()
+        self.flush_pending_save()
+        self.save_worker.close()
+        self.undo_log.close()
+        super().closeEvent(event)
+
+    def auto_save(self, compact=False):
+        """
+        Automatically save the current state. Edits made through commands are appended to the
+        save's journal; a full snapshot is written when other changes were made, the journal
+        has grown past JOURNAL_COMPACT_RECORDS or `compact` is set.
+        """
+        self.save_timer.stop()
+        self.save_pending = False
+        records, self.pending_records = self.pending_records, []
         if not self.settings["auto_save_enabled"] or self.loading_list:
             log("Skipping auto-save", "DEBUG")
+            # The skipped records are missing from the journal now
+            self.snapshot_needed = True
             return
 
         if not self.save_id:
             self.save_id = str(uuid.uuid4())
+            self.snapshot_needed = True
+
+        save_path = os.path.join(self.settings["save_directory"], f"{self.save_id}.json.gz")
+        if not compact and not self.snapshot_needed and self.journal_length + len(records) <= JOURNAL_COMPACT_RECORDS:
+            if records:
+                self.save_worker.submit(JournalJob(save_path, records))
+                self.journal_length += len(records)
+            return
 
         data = self.tree_to_dict()
         if data:
-            save_path = os.path.join(self.settings["save_directory"], f"{self.save_id}.json.gz")
-
-            # Create backup before saving if enabled
+            self.snapshot_needed = False
+            self.journal_length = 0
+            backup_dir = None
             if self.settings["backup_enabled"]:
-                self.create_backup(save_path, data)
-
-            # Save current state
-            with gzip.open(save_path, "wt", encoding="utf-8") as f:
-                json.dump(data, f)
-            log(f"Saved list to {save_path}", "INFO")
-
-    def create_backup(self, save_path, data):
-        """Create a backup of the save file"""
-        if not os.path.exists(save_path):
-            return  # Don't backup if original doesn't exist
-
-        backup_dir = os.path.join(self.settings["save_directory"], "backups", self.save_id)
-        os.makedirs(backup_dir, exist_ok=True)
-
-        # Check if we have any existing backups
-        existing_backups = []
-        for file in os.listdir(backup_dir):
-            if file.startswith("backup_") and file.endswith(".json.gz"):
-                backup_path = os.path.join(backup_dir, file)
-                existing_backups.append((os.path.getmtime(backup_path), backup_path))
-
-        # Sort backups by modification time (newest first)
-        existing_backups.sort(reverse=True)
-
-        # Compare with most recent backup if it exists
-        if existing_backups:
-            latest_backup_path = existing_backups[0][1]
-            try:
-                with gzip.open(latest_backup_path, "rt", encoding="utf-8") as f:
-                    latest_backup_data = json.load(f)
-                    # Compare data with latest backup
-                    if self.compare_save_data(data, latest_backup_data):
-                        log("Skip backup - content unchanged", "DEBUG")
-                        return
-            except Exception as e:
-                log(f"Error reading latest backup: {e}", "ERROR")
-
-        # Create new backup with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(backup_dir, f"backup_{timestamp}.json.gz")
-
-        try:
-            with gzip.open(backup_path, "wt", encoding="utf-8") as f:
-                json.dump(data, f)
-            log(f"Created backup at {backup_path}", "DEBUG")
+                backup_dir = os.path.join(self.settings["save_directory"], "backups", self.save_id)
 
-            # Clean up old backups
-            self.cleanup_old_backups(backup_dir)
-        except Exception as e:
-            log(f"Failed to create backup: {e}", "ERROR")
-
-    def compare_save_data(self, data1, data2):
-        """Compare two save data structures for equality"""
-        try:
-            # Convert both to JSON strings with sorted keys for consistent comparison
-            json1 = json.dumps(data1, sort_keys=True)
-            json2 = json.dumps(data2, sort_keys=True)
-            return json1 == json2
-        except Exception as e:
-            log(f"Error comparing save data: {e}", "ERROR")
-            return False
+            # Serializing, compressing and writing happen on the save worker, which also checkpoints the undo
+            # history with the snapshot for the next session
+            records = [entry if isinstance(entry, dict) else entry.to_record() for entry in self.undo_stack]
+            self.save_worker.submit(
+                SaveJob(save_path, data, backup_dir, self.settings["max_backups"], self.undo_log, records)
+            )
 
-    def cleanup_old_backups(self, backup_dir):
-        """Remove old backups exceeding the maximum limit"""
-        try:
-            backups = []
-            for file in os.listdir(backup_dir):
-                if file.startswith("backup_") and file.endswith(".json.gz"):
-                    path = os.path.join(backup_dir, file)
-                    backups.append((os.path.getmtime(path), path))
-
-            # Sort backups by modification time (newest first)
-            backups.sort(reverse=True)
-
-            # Remove old backups exceeding the limit
-            while len(backups) > self.settings["max_backups"]:
-                _, path = backups.pop()
-                os.remove(path)
-                log(f"Removed old backup: {path}", "DEBUG")
-        except Exception as e:
-            log(f"Failed to cleanup backups: {e}", "ERROR")
+    def on_save_finished(self, job, error):
+        """Reports a save written by the save worker, on the GUI thread"""
+        if error is not None:
+            log(f"Failed to save list to {job.save_path}: {error}", "ERROR")
+            self.statusBar().showMessage(f"Saving failed: {error}")
+            return
+        if isinstance(job, JournalJob):
+            log(f"Journaled {len(job.records)} edit(s) for {job.save_path}", "DEBUG")
+            return
+        if job.history_error is not None:
+            log(f"Failed to save undo history: {job.history_error}", "ERROR")
+        if job.backup_version:
+            log(f"Created backup version {job.backup_version['root'][:12]} in {job.backup_dir}", "DEBUG")
+        log(f"Saved list to {job.save_path}", "INFO")
+        self.statusBar().showMessage("Saved", 2000)
+
+    def wait_for_saves(self):
+        """Writes scheduled changes and waits until the save files on disk are up to date"""
+        self.flush_pending_save()
+        self.save_worker.wait()
 
     def on_title_changed(self):
         """Handle title changes"""
         if not self.loading_list:
-            self.auto_save()
+            self.schedule_journal({"op": "set", "key": "__title", "value": self.title_data()})
+
+    def on_collapsible_changed(self):
+        self.schedule_preview()
+        if not self.loading_list:
+            self.schedule_journal({"op": "set", "key": "__collapsible", "value": self.collapsible_checkbox.isChecked()})
 
     def load_from_save(self, save_id):
         """Load data from a saved file"""
+        self.wait_for_saves()
         try:
             save_path = os.path.join(self.settings["save_directory"], f"{save_id}.json.gz")
+
+            # The snapshot with the edits journaled since it replayed onto it
+            data, journal_length, base, journal_current = load_save(save_path)
+            # Cancelling leaves the current list open
+            nodes = self.build_nodes_with_progress(data)
+            if nodes is None:
+                log(f"Cancelled loading {save_id}", "INFO")
+                return
+
             self.loading_list = True
             self.save_id = save_id  # Store the save ID
 
             # Clear undo/redo stacks before loading new data
-            self.undo_stack.clear()
-            self.redo_stack.clear()
+            self.clear_history()
 
-            with gzip.open(save_path, "rt", encoding="utf-8") as f:
-                data = json.load(f)
-                self.clear_list(add_category=False)
-                self.load_tree_data(data)
-                self.update_preview()
+            self.clear_list(add_category=False)
+            self.load_tree_data(data, nodes)
+            self.update_preview()
+            # Edits journaled after records that were not replayed would be lost, so they wait for a new snapshot
+            self.snapshot_needed = not journal_current
+            self.journal_length = journal_length
+
+            # Earlier sessions' undo history is only read back when undoing past this session's steps. It was
+            # checkpointed with the snapshot, so edits journaled after that leave it behind the list
+            self.undo_log.close()
+            if journal_length:
+                self.undo_log = UndoLog(history_path(save_path))
+            else:
+                self.undo_log = UndoLog.open(history_path(save_path), base)
+            self.undo_action.setEnabled(bool(self.undo_log))
 
             self.loading_list = False
 
@@ -1074,24 +1380,84 @@ class WikiListBuilder(QMainWindow):
     def execute_command(self, command):
         """Execute a command and add it to the undo stack"""
         command.do()
-        self.undo_stack.append(command)
+        command.locate()
+        # Typing into a field merges its keystrokes into one undo step
+        last = self.undo_stack[-1] if self.undo_stack else None
+        if isinstance(last, TreeCommand) and last.merge(command):
+            self.undo_memory -= last.size
+            last.size = last.memory_size()
+            self.undo_memory += last.size
+        else:
+            self.push_undo(command)
         self.redo_stack.clear()
-        self.update_preview()
-        self.auto_save()
+        self.schedule_preview()
+        self.journal_command(command)
         # Update action states
         self.undo_action.setEnabled(True)
         self.redo_action.setEnabled(False)
 
+    def push_undo(self, command):
+        command.size = command.memory_size()
+        self.undo_stack.append(command)
+        self.undo_memory += command.size
+
+        # Spill the oldest steps to the undo log in one batch, down to half the budget
+        limit = self.settings["undo_memory_mb"] * 1_000_000
+        if self.undo_memory <= limit:
+            return
+        count = 0
+        spilled_memory = 0
+        while count < len(self.undo_stack) - 1 and self.undo_memory - spilled_memory > limit // 2:
+            spilled_memory += self.undo_entry_size(self.undo_stack[count])
+            count += 1
+        records = [entry if isinstance(entry, dict) else entry.to_record() for entry in self.undo_stack[:count]]
+        self.undo_log.push(records)
+        del self.undo_stack[:count]
+        self.undo_memory -= spilled_memory
+
+    @staticmethod
+    def undo_entry_size(entry):
+        return entry["size"] if isinstance(entry, dict) else entry.size
+
+    def clear_history(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        # The history of the previous list stays on disk for when it is opened again. A new list's history
+        # is only moved there by the snapshot checkpointing it, which may still be waiting to be written
+        if self.undo_log.temporary:
+            self.save_worker.wait()
+        self.undo_log.close()
+        self.undo_log = UndoLog()
+        self.undo_memory = 0
+        self.undo_action.setEnabled(False)
+        self.redo_action.setEnabled(False)
+
     def undo(self):
         """Undo the last command"""
+        try:
+            while not self.undo_stack and self.undo_log:
+                self.undo_stack = self.undo_log.pop()
+                self.undo_memory = sum(map(self.undo_entry_size, self.undo_stack))
+        except (OSError, ValueError) as e:
+            log(f"Cannot read undo history: {e}", "WARNING")
+            self.undo_log.clear()
         if self.undo_stack:
             command = self.undo_stack.pop()
+            self.undo_memory -= self.undo_entry_size(command)
+            if isinstance(command, dict):
+                try:
+                    command = TreeCommand.from_record(self.model, command)
+                except KeyError as e:
+                    # Changes made outside of commands, like sorting, can leave old steps without their items
+                    log(f"Cannot undo {command['description']}: {e}", "WARNING")
+                    self.undo_action.setEnabled(bool(self.undo_stack or self.undo_log))
+                    return
             command.undo()
             self.redo_stack.append(command)
-            self.update_preview()
-            self.auto_save()
+            self.schedule_preview()
+            self.journal_command(command, undone=True)
             # Update action states
-            self.undo_action.setEnabled(bool(self.undo_stack))
+            self.undo_action.setEnabled(bool(self.undo_stack or self.undo_log))
             self.redo_action.setEnabled(True)
 
     def redo(self):
@@ -1099,49 +1465,53 @@ class WikiListBuilder(QMainWindow):
         if self.redo_stack:
             command = self.redo_stack.pop()
             command.do()
-            self.undo_stack.append(command)
-            self.update_preview()
-            self.auto_save()
+            command.locate()
+            self.push_undo(command)
+            self.schedule_preview()
+            self.journal_command(command)
             # Update action states
             self.undo_action.setEnabled(True)
             self.redo_action.setEnabled(bool(self.redo_stack))
 
+    def current_node(self):
+        """Returns the document node selected in the tree view, or None"""
+        index = self.tree.currentIndex()
+        return self.model.node(index) if index.isValid() else None
+
+    def set_current_node(self, node):
+        self.tree.setCurrentIndex(self.model.index_of(node))
+
+    def set_node_expanded(self, node, expanded=True):
+        self.tree.setExpanded(self.model.index_of(node), expanded)
+
     def add_category(self):
-        item = QTreeWidgetItem()
-        item.setText(0, "New Category")
-        item.setData(0, Qt.ItemDataRole.UserRole + 2, "category")
-        command = TreeCommand("Add Category", self.tree, "add", item)
+        item = DocumentNode("New Category", "category")
+        command = TreeCommand("Add Category", self.model, "add", item, self.model.root)
         self.execute_command(command)
-        self.tree.setCurrentItem(item)
+        self.set_current_node(item)
 
     def add_subcategory(self):
-        current = self.tree.currentItem()
+        current = self.current_node()
         if current:
-            item = QTreeWidgetItem()
-            item.setText(0, "New Subcategory")
-            item.setData(0, Qt.ItemDataRole.UserRole + 2, "subcategory")
-            command = TreeCommand("Add Subcategory", self.tree, "add", item, current)
+            item = DocumentNode("New Subcategory", "subcategory")
+            command = TreeCommand("Add Subcategory", self.model, "add", item, current)
             self.execute_command(command)
-            current.setExpanded(True)
-            self.tree.setCurrentItem(item)
+            self.set_node_expanded(current)
+            self.set_current_node(item)
 
     def add_item(self):
-        current = self.tree.currentItem()
+        current = self.current_node()
         if current:
-            item = QTreeWidgetItem()
-            item.setText(0, "New Item")
-            item.setData(0, Qt.ItemDataRole.UserRole, "")
-            item.setData(0, Qt.ItemDataRole.UserRole + 2, "item")
-            command = TreeCommand("Add Item", self.tree, "add", item, current)
+            item = DocumentNode("New Item", "item", "")
+            command = TreeCommand("Add Item", self.model, "add", item, current)
             self.execute_command(command)
-            current.setExpanded(True)
-            self.tree.setCurrentItem(item)
+            self.set_node_expanded(current)
+            self.set_current_node(item)
 
     def remove_selected(self):
-        current = self.tree.currentItem()
+        current = self.current_node()
         if current:
-            parent = current.parent()
-            command = TreeCommand("Remove Item", self.tree, "remove", current, parent)
+            command = TreeCommand("Remove Item", self.model, "remove", current, current.parent)
             self.execute_command(command)
 
     def update_button_states(self, current):
@@ -1153,7 +1523,7 @@ class WikiListBuilder(QMainWindow):
             self.add_item_btn.setEnabled(True)
             return
 
-        item_type = current.data(0, Qt.ItemDataRole.UserRole + 2)
+        item_type = current.type
 
         if item_type == "category":
             # Categories can contain anything
@@ -1176,18 +1546,18 @@ class WikiListBuilder(QMainWindow):
         if self.desc_input.receivers(self.desc_input.textChanged) > 0:
             self.desc_input.textChanged.disconnect()
 
-        current = self.tree.currentItem()
+        current = self.current_node()
         if current:
-            self.title_input.setText(current.text(0))
+            self.title_input.setText(current.name)
             # Only show and enable description for items
-            item_type = current.data(0, Qt.ItemDataRole.UserRole + 2)
+            item_type = current.type
             is_item = item_type == "item"
             self.desc_label.setVisible(is_item)
             self.desc_input.setVisible(is_item)
             self.desc_input.setEnabled(is_item)
             if is_item:
                 self.desc_input.blockSignals(True)
-                self.desc_input.setText(current.data(0, Qt.ItemDataRole.UserRole) or "")
+                self.desc_input.setText(current.description or "")
                 self.desc_input.blockSignals(False)
                 self.desc_input.textChanged.connect(lambda: self.update_description(current))
             else:
@@ -1205,35 +1575,41 @@ class WikiListBuilder(QMainWindow):
 
     def update_description(self, item):
         """Update description and auto-save"""
-        if item and item.childCount() == 0:
-            old_data = {"text": item.text(0), "description": item.data(0, Qt.ItemDataRole.UserRole)}
-            new_data = {"text": item.text(0), "description": self.desc_input.toPlainText()}
-            command = TreeCommand("Modify Description", self.tree, "modify", item, old_data=old_data, new_data=new_data)
+        if item and not item.children:
+            old_data = {"text": item.name, "description": item.description}
+            new_data = {"text": item.name, "description": self.desc_input.toPlainText()}
+            if new_data == old_data:
+                return
+            command = TreeCommand(
+                "Modify Description", self.model, "modify", item, old_data=old_data, new_data=new_data
+            )
             self.execute_command(command)
 
     def update_selected_item(self):
         """Update title and auto-save"""
-        current = self.tree.currentItem()
+        current = self.current_node()
         if current:
-            old_data = {"text": current.text(0), "description": current.data(0, Qt.ItemDataRole.UserRole)}
-            new_data = {"text": self.title_input.text(), "description": current.data(0, Qt.ItemDataRole.UserRole)}
-            command = TreeCommand("Modify Item", self.tree, "modify", current, old_data=old_data, new_data=new_data)
+            old_data = {"text": current.name, "description": current.description}
+            new_data = {"text": self.title_input.text(), "description": current.description}
+            # Selecting an item fills in its title too, which changes nothing
+            if new_data == old_data:
+                return
+            command = TreeCommand("Modify Item", self.model, "modify", current, old_data=old_data, new_data=new_data)
             self.execute_command(command)
 
     def show_options(self):
-        current = self.tree.currentItem()
+        current = self.current_node()
         if current:
             # Get current options
-            options = current.data(0, Qt.ItemDataRole.UserRole + 1) or {}
+            options = current.options or {}
             extra_depth = options.get("extra_depth", 0)
 
             dialog = OptionsDialog(self, extra_depth)
             if dialog.exec():
                 # Update options
                 options = {"extra_depth": dialog.depth_spinner.value()}
-                current.setData(0, Qt.ItemDataRole.UserRole + 1, options)
-                self.update_preview()
-                self.auto_save()
+                self.model.update_node(current, options=options)
+                self.schedule_update()
 
     def edit_titles(self):
         # Get the stored title data if it exists, otherwise use the display text
@@ -1248,60 +1624,69 @@ class WikiListBuilder(QMainWindow):
                 # Store the full title data and show first title in input
                 self.list_title_input.setProperty("titleData", titles)
                 self.list_title_input.setText(" | ".join(t["title"] if isinstance(t, dict) else t for t in titles))
-            self.update_preview()
-            self.auto_save()
+            self.schedule_update()
 
     def tree_to_dict(self):
-        def process_item(item):
-            item_type = item.data(0, Qt.ItemDataRole.UserRole + 2)
-
-            if item.childCount() == 0:
-                # For leaf nodes (items)
-                return {"__metadata": {"type": item_type}, "description": item.data(0, Qt.ItemDataRole.UserRole)}
-
-            result = {"__metadata": {"type": item_type}}
-
-            options = item.data(0, Qt.ItemDataRole.UserRole + 1)
-            if options:
-                result["__options"] = options
-
-            for i in range(item.childCount()):
-                child = item.child(i)
-                result[child.text(0)] = process_item(child)
-            return result
-
         root_dict = {}
 
         # Add collapsible state to the data
         root_dict["__collapsible"] = self.collapsible_checkbox.isChecked()
+        root_dict["__title"] = self.title_data()
 
-        # Handle title data
-        title_data = self.list_title_input.property("titleData")
-        if title_data:
-            root_dict["__title"] = title_data
-        else:
-            root_dict["__title"] = self.list_title_input.text()
-
-        for i in range(self.tree.topLevelItemCount()):
-            item = self.tree.topLevelItem(i)
-            root_dict[item.text(0)] = process_item(item)
+        # The document tree is read directly, without going through the view; unchanged
+        # categories come from their nodes' cached serializations
+        for node in self.model.root.children:
+            root_dict[node.name] = node.to_dict()
         return root_dict
 
+    def title_data(self):
+        """Returns the full title data if several titles are set, otherwise the title text"""
+        return self.list_title_input.property("titleData") or self.list_title_input.text()
+
     def update_preview(self):
+        # A direct refresh makes any scheduled one redundant
+        self.preview_timer.stop()
         data = self.tree_to_dict()
         if data:
             title = data.pop("__title", "List of Items")
             collapsible = data.pop("__collapsible", False)
 
-            # Create wiki text
+            # Only the dicts above come from the cache; the wiki text and its HTML are rendered from
+            # the whole list on every refresh, as rowspans and column counts depend on all of it
             builder = ManualListBuilder(title, data, collapsible=collapsible)
             wiki_text = builder.build()
             self.preview.setText(wiki_text)
 
-            # Update HTML preview
-            table_html = wiki_to_html_table(wiki_text)
-            full_html = create_html_page(table_html)
-            self.web_view.setHtml(full_html)
+            # Update HTML preview; large tables only render the rows in view
+            table_blocks = wiki_to_html_blocks(wiki_text)
+            if table_blocks.blocks and table_blocks.row_count >= self.settings["virtual_preview_rows"]:
+                self.run_preview_script(virtual_preview_script(table_blocks))
+            else:
+                self.run_preview_script(preview_patch_script(table_blocks.to_html()))
+
+    def run_preview_script(self, script):
+        """Runs a preview update in the preview shell, or keeps it until the shell has loaded"""
+        if script == self.last_preview_script:
+            return
+        if not self.preview_ready:
+            self.pending_preview_script = script
+            return
+
+        self.last_preview_script = script
+        self.web_view.page().runJavaScript(script)
+
+    def on_preview_loaded(self, ok):
+        self.preview_ready = ok
+        if not ok:
+            log("Preview page failed to load", "WARNING")
+            return
+
+        # A freshly loaded shell is empty, so it also gets the table that was shown before
+        script = self.pending_preview_script or self.last_preview_script
+        self.pending_preview_script = None
+        self.last_preview_script = None
+        if script is not None:
+            self.run_preview_script(script)
 
     def export_list(self):
         """Renamed from save_list - exports to external file"""
@@ -1326,10 +1711,17 @@ class WikiListBuilder(QMainWindow):
         if file_name:
             with open(file_name, "r", encoding="utf-8") as f:
                 data = json.load(f)
-                self.load_tree_data(data)
+            nodes = self.build_nodes_with_progress(data)
+            if nodes is not None:
+                self.load_tree_data(data, nodes)
                 self.update_preview()
+                self.snapshot_needed = True
 
-    def load_tree_data(self, data, parent=None):
+    def load_tree_data(self, data, nodes=None):
+        """
+        Shows list data: sets its title and collapsible state and adds its entries after the
+        current ones. `nodes` are the entries already built by build_nodes, if they were.
+        """
         # Set title if present
         if "__title" in data:
             title_data = data["__title"]
@@ -1343,39 +1735,35 @@ class WikiListBuilder(QMainWindow):
                 )
             else:
                 self.list_title_input.setText(str(title_data))
-            data = {k: v for k, v in data.items() if k != "__title"}
 
         # Set collapsible state if present
         if "__collapsible" in data:
             self.collapsible_checkbox.setChecked(data["__collapsible"])
-            data = {k: v for k, v in data.items() if k != "__collapsible"}
 
-        for key, value in data.items():
-            if key in ["__options", "__metadata"]:
-                continue
+        # The whole list goes into the model as one batch, so the view lays it out once
+        if nodes is None:
+            nodes = build_nodes(data)
+        self.model.insert_nodes(self.model.root, len(self.model.root.children), nodes)
 
-            if isinstance(value, dict):
-                if parent is None:
-                    item = QTreeWidgetItem(self.tree)
-                else:
-                    item = QTreeWidgetItem(parent)
-                item.setText(0, key)
-
-                # Set metadata (item type)
-                if "__metadata" in value:
-                    item.setData(0, Qt.ItemDataRole.UserRole + 2, value["__metadata"].get("type", "category"))
+    def build_nodes_with_progress(self, data):
+        """Builds the nodes of list data, showing a progress dialog for large lists; returns None if cancelled"""
+        total = count_nodes(data)
+        if total < LOAD_PROGRESS_NODES:
+            return build_nodes(data)
 
-                # Set options if present
-                if "__options" in value:
-                    item.setData(0, Qt.ItemDataRole.UserRole + 1, value["__options"])
+        dialog = QProgressDialog("Loading list...", "Cancel", 0, total, self)
+        dialog.setWindowTitle("Loading")
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(500)
 
-                # Set description for items
-                if "description" in value:
-                    item.setData(0, Qt.ItemDataRole.UserRole, value["description"])
+        def progress(built):
+            # A modal progress dialog processes events in setValue, which lets Cancel through
+            dialog.setValue(built)
+            return not dialog.wasCanceled()
 
-                # Recursively process children (excluding metadata and options)
-                child_data = {k: v for k, v in value.items() if k not in ["__metadata", "__options", "description"]}
-                self.load_tree_data(child_data, item)
+        nodes = build_nodes(data, progress)
+        dialog.close()
+        return nodes
 
     def copy_preview(self):
         QApplication.clipboard().setText(self.preview.toPlainText())
@@ -1387,46 +1775,46 @@ class WikiListBuilder(QMainWindow):
         self._move_item("down")
 
     def _move_item(self, direction):
-        current = self.tree.currentItem()
+        current = self.current_node()
         if not current:
             return
 
-        parent = current.parent() or self.tree.invisibleRootItem()
-        current_index = parent.indexOfChild(current)
+        current_index = current.row()
         new_index = current_index - 1 if direction == "up" else current_index + 1
 
-        if 0 <= new_index < parent.childCount():
+        if 0 <= new_index < len(current.parent.children):
             command = TreeCommand(
                 "Move Item",
-                self.tree,
+                self.model,
                 "move",
                 current,
                 old_data={"index": current_index},
                 new_data={"index": new_index},
             )
             self.execute_command(command)
-            self.tree.setCurrentItem(current)
+            self.set_current_node(current)
             self.update_move_buttons()
 
     def update_move_buttons(self):
-        current = self.tree.currentItem()
+        current = self.current_node()
         if not current:
             self.move_up_btn.setEnabled(False)
             self.move_down_btn.setEnabled(False)
             return
 
-        parent = current.parent() or self.tree.invisibleRootItem()
-        current_index = parent.indexOfChild(current)
+        current_index = current.row()
 
         self.move_up_btn.setEnabled(current_index > 0)
-        self.move_down_btn.setEnabled(current_index < parent.childCount() - 1)
+        self.move_down_btn.setEnabled(current_index < len(current.parent.children) - 1)
 
     def clear_list(self, add_category=False):
         """Clear all current list data and optionally add empty category"""
+        self.flush_pending_save()
+
         # Temporarily disable auto-save
         self.auto_save_enabled = False
 
-        self.tree.clear()
+        self.model.clear()
         self.list_title_input.setText("List of Items")
         self.list_title_input.setProperty("titleData", None)
         self.collapsible_checkbox.setChecked(self.settings["default_collapsible"])
@@ -1436,26 +1824,25 @@ class WikiListBuilder(QMainWindow):
             self.save_id = str(uuid.uuid4())
 
             # Add empty category
-            item = QTreeWidgetItem(self.tree)
-            item.setText(0, "New Category")
-            item.setData(0, Qt.ItemDataRole.UserRole + 2, "category")
-            self.tree.setCurrentItem(item)
+            item = DocumentNode("New Category", "category")
+            self.model.append_node(self.model.root, item)
+            self.set_current_node(item)
 
             self.list_title_input.setText("New List")
 
         # Clear undo/redo stacks
-        self.undo_stack.clear()
-        self.redo_stack.clear()
-        self.undo_action.setEnabled(False)
-        self.redo_action.setEnabled(False)
+        self.clear_history()
 
         # Re-enable auto-save after clearing
         self.auto_save_enabled = True
+        self.snapshot_needed = True
+        self.journal_length = 0
 
         self.update_preview()
 
     def show_list_selection(self):
         """Show the list selection dialog"""
+        self.wait_for_saves()
         dialog = SaveSelectionDialog(self)
         if dialog.exec():
             selected = dialog.get_selected()
@@ -1469,25 +1856,14 @@ class WikiListBuilder(QMainWindow):
 
     def sort_category_items(self, parent, ascending=True):
         """Sort the direct children of a category or subcategory"""
-        # Get all children
-        items = []
-        for i in range(parent.childCount()):
-            items.append(parent.child(i))
-
         # Sort items by text
-        items.sort(key=lambda x: x.text(0).lower(), reverse=not ascending)
-
-        # Remove and re-add items in sorted order
-        for item in items:
-            parent.removeChild(item)
-            parent.addChild(item)
+        self.model.sort_children(parent, key=lambda x: x.name.lower(), reverse=not ascending)
 
-        self.update_preview()
-        self.auto_save()
+        self.schedule_update()
 
     def show_context_menu(self, position):
-        item = self.tree.itemAt(position)
-        if not item:
+        index = self.tree.indexAt(position)
+        if not index.isValid():
             background_menu = QMenu()
 
             # Add new category action
@@ -1510,15 +1886,16 @@ class WikiListBuilder(QMainWindow):
             return
 
         menu = QMenu()
-        item_type = item.data(0, Qt.ItemDataRole.UserRole + 2)
+        item = self.model.node(index)
+        item_type = item.type
 
         # Add type-specific actions
         if item_type in ("category", "subcategory"):
             # Expand/collapse actions
             expand_action = menu.addAction("Expand")
-            expand_action.triggered.connect(lambda: item.setExpanded(True))
+            expand_action.triggered.connect(lambda: self.set_node_expanded(item, True))
             collapse_action = menu.addAction("Collapse")
-            collapse_action.triggered.connect(lambda: item.setExpanded(False))
+            collapse_action.triggered.connect(lambda: self.set_node_expanded(item, False))
 
             menu.addSeparator()
             expand_all_action = menu.addAction("Expand All")
@@ -1539,10 +1916,9 @@ class WikiListBuilder(QMainWindow):
         move_menu = menu.addMenu("Move")
 
         # Get movement possibilities
-        parent = item.parent() or self.tree.invisibleRootItem()
-        current_index = parent.indexOfChild(item)
+        current_index = item.row()
         can_move_up = current_index > 0
-        can_move_down = current_index < parent.childCount() - 1
+        can_move_down = current_index < len(item.parent.children) - 1
 
         # Only show enabled move actions if they're possible
         move_up_action = move_menu.addAction("Move Up")
@@ -1562,47 +1938,27 @@ class WikiListBuilder(QMainWindow):
 
     def expand_collapse_all(self, expand=True):
         """Expand or collapse all items in the tree"""
-        root = self.tree.invisibleRootItem()
-        for i in range(root.childCount()):
-            self.expand_collapse_recursive(root.child(i), expand)
+        if expand:
+            self.tree.expandAll()
+        else:
+            self.tree.collapseAll()
 
     def sort_tree(self, ascending=True):
         """Sort the tree items alphabetically"""
-        root = self.tree.invisibleRootItem()
-        self._sort_items(root, ascending)
-        self.update_preview()
-        self.auto_save()
-
-    def _sort_items(self, parent, ascending=True):
-        """Recursively sort items within a parent item"""
-        # Get all children
-        items = []
-        for i in range(parent.childCount()):
-            items.append(parent.child(i))
-
-        # Sort items by text
-        items.sort(key=lambda x: x.text(0).lower(), reverse=not ascending)
-
-        # Remove and re-add items in sorted order
-        for item in items:
-            parent.removeChild(item)
-            parent.addChild(item)
-            # Recursively sort children
-            self._sort_items(item, ascending)
+        self.model.sort_children(self.model.root, key=lambda x: x.name.lower(), reverse=not ascending, recursive=True)
+        self.schedule_update()
 
     def collapse_empty_categories(self):
         """Collapse categories and subcategories that have no items"""
-        root = self.tree.invisibleRootItem()
-        self._collapse_if_empty(root)
+        self._collapse_if_empty(self.model.root)
 
     def _collapse_if_empty(self, parent):
         """Recursively check and collapse empty categories"""
         has_items = False
 
         # Check all children
-        for i in range(parent.childCount()):
-            child = parent.child(i)
-            child_type = child.data(0, Qt.ItemDataRole.UserRole + 2)
+        for child in parent.children:
+            child_type = child.type
 
             if child_type == "item":
                 has_items = True
@@ -1612,16 +1968,17 @@ class WikiListBuilder(QMainWindow):
                     has_items = True
 
         # Collapse if no items found
-        if not has_items and parent != self.tree.invisibleRootItem():
-            parent.setExpanded(False)
+        if not has_items and parent is not self.model.root:
+            self.set_node_expanded(parent, False)
 
         return has_items
 
     def expand_collapse_recursive(self, item, expand=True):
         """Recursively expand or collapse an item and all its children"""
-        item.setExpanded(expand)
-        for i in range(item.childCount()):
-            self.expand_collapse_recursive(item.child(i), expand)
+        self.set_node_expanded(item, expand)
+        for child in item.children:
+            if child.children:
+                self.expand_collapse_recursive(child, expand)
 
     def show_settings_dialog(self):
         dialog = SettingsDialog(self)
@@ -1629,11 +1986,14 @@ class WikiListBuilder(QMainWindow):
         # Set current settings
         dialog.save_dir_input.setText(self.settings["save_directory"])
         dialog.auto_save_checkbox.setChecked(self.settings["auto_save_enabled"])
+        dialog.auto_save_interval_spinner.setValue(self.settings["auto_save_interval"])
         dialog.default_collapsible.setChecked(self.settings["default_collapsible"])
 
         # Add backup settings fields
         dialog.backup_enabled.setChecked(self.settings["backup_enabled"])
         dialog.max_backups_spinner.setValue(self.settings["max_backups"])
+        dialog.virtual_rows_spinner.setValue(self.settings["virtual_preview_rows"])
+        dialog.undo_memory_spinner.setValue(self.settings["undo_memory_mb"])
 
         if dialog.exec():
             # Save new settings
@@ -1641,6 +2001,7 @@ class WikiListBuilder(QMainWindow):
             new_save_dir = dialog.save_dir_input.text()
 
             if old_save_dir != new_save_dir:
+                self.wait_for_saves()
                 try:
                     # Create new save directory if it doesn't exist
                     os.makedirs(new_save_dir, exist_ok=True)
@@ -1699,12 +2060,18 @@ class WikiListBuilder(QMainWindow):
                 {
                     "save_directory": new_save_dir,
                     "auto_save_enabled": dialog.auto_save_checkbox.isChecked(),
+                    "auto_save_interval": dialog.auto_save_interval_spinner.value(),
                     "default_collapsible": dialog.default_collapsible.isChecked(),
                     "backup_enabled": dialog.backup_enabled.isChecked(),
                     "max_backups": dialog.max_backups_spinner.value(),
+                    "virtual_preview_rows": dialog.virtual_rows_spinner.value(),
+                    "undo_memory_mb": dialog.undo_memory_spinner.value(),
                 }
             )
 
+            self.last_preview_script = None
+            self.update_preview()
+
             self.save_settings()
 
     def load_settings(self):
@@ -1730,6 +2097,7 @@ class WikiListBuilder(QMainWindow):
             QMessageBox.information(self, "No Backups", "Save the list first to create backups.")
             return
 
+        self.wait_for_saves()
         dialog = BackupManagerDialog(self, self.save_id)
         dialog.exec()
 
@@ -1737,6 +2105,7 @@ class WikiListBuilder(QMainWindow):
 if __name__ == "__main__":
     import sys
 
+    register_asset_scheme()
     app = QApplication(sys.argv)  # Pass sys.argv to QApplication
     myappid = "mycompany.myproduct.subproduct.version"  # arbitrary string
     ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
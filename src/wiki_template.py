@@ -1,4 +1,5 @@
 from api import WikiAPI
+import tracing
 from typing import Dict, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
@@ -173,16 +174,19 @@ class WikiTemplate:
     processing wiki categories and their members according to a predefined category mapping system.
     Attributes:
         title (str): The title of the wiki table.
-        wiki_api (WikiAPI): Interface for wiki operations.
+        wiki_api (WikiAPI): Interface for wiki operations. Any object with the same
+            `get_category_members`/`get_page_categories` methods can be used, e.g. a DumpCategoryIndex.
         rows (list): Storage for table rows.
         categories (dict): Nested dictionary storing category hierarchies and their members.
         category_map (CategoryMap): Mapping system for categories and their relationships.
+        max_workers (int): Number of concurrent category requests made by fetch_category.
         ```
     """
 
-    def __init__(self, title, category_map: CategoryMap):
+    def __init__(self, title, category_map: CategoryMap, wiki_api=None, max_workers: int = 10):
         self.title = title
-        self.wiki_api = WikiAPI()
+        self.wiki_api = wiki_api or WikiAPI()
+        self.max_workers = max_workers
         self.rows = []
         self.categories = {}
         self.category_map = category_map
@@ -237,12 +241,15 @@ class WikiTemplate:
         if member not in target_dict["members"]:
             target_dict["members"].append(member)
 
-    def _process_member_categories(self, member: str, base_category: str):
-        categories = self.wiki_api.get_page_categories(member)
+    def _process_member_categories(self, members: List[str], base_category: str, submitted_ns=None):
+        tracing.record("queue wait", submitted_ns, "worker")
+        with tracing.span("get_pages_categories", "worker", titles=len(members)):
+            page_categories = self.wiki_api.get_pages_categories(members)
         result = []
-        for category in categories:
-            if category != base_category:
-                result.append((category, member))
+        for member in members:
+            for category in page_categories.get(member, []):
+                if category != base_category:
+                    result.append((category, member))
         return result
 
     def fetch_category(self, category_name: str):
@@ -256,25 +263,37 @@ class WikiTemplate:
         Returns:
             None
         """
-        members, subcategories = self.wiki_api.get_category_members(category_name)
-        unCategorized = set(members)
+        with tracing.span("get_category_members", "api", category=category_name):
+            members, subcategories = self.wiki_api.get_category_members(category_name)
+        with tracing.span("fetch_member_categories", "api", members=len(members)):
+            results = self.fetch_member_categories(members, category_name)
+        with tracing.span("aggregate_member_categories", "mapping"):
+            unCategorized = self.aggregate_member_categories(members, results)
+
+        if unCategorized:
+            print("Uncategorized members:")
+            for member in sorted(unCategorized):
+                print(f"https://www.arathia.net/wiki/{member}")
 
-        # Process categories in parallel
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            process_func = partial(self._process_member_categories, base_category=category_name)
-            results = list(executor.map(process_func, members))
+    def fetch_member_categories(self, members: List[str], base_category: str) -> List[List[Tuple[str, str]]]:
+        """Fetches the categories of all members in parallel, one API batch of titles per task"""
+        batch_size = getattr(self.wiki_api, "batch_size", 1)
+        batches = [members[i : i + batch_size] for i in range(0, len(members), batch_size)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            process_func = partial(
+                self._process_member_categories, base_category=base_category, submitted_ns=tracing.now()
+            )
+            return list(executor.map(process_func, batches))
 
-        # Aggregate results
+    def aggregate_member_categories(self, members: List[str], results: List[List[Tuple[str, str]]]) -> set:
+        """Adds fetched (category, member) pairs to the mapped categories and returns the uncategorized members"""
+        unCategorized = set(members)
         for member_results in results:
             for category, member in member_results:
                 parent_category, subcategory, display_title = self.category_map.get_mapped_category(category)
                 self._add_to_categories(parent_category, subcategory, member)
                 unCategorized.discard(member)
-
-        if unCategorized:
-            print("Uncategorized members:")
-            for member in sorted(unCategorized):
-                print(f"https://www.arathia.net/wiki/{member}")
+        return unCategorized
 
     def generate_header(self):
         return f"""{{| class="mw-collapsible mw-collapsed wikitable custom-button" style="width:100%;"
@@ -323,6 +342,10 @@ class WikiTemplate:
         Returns:
             str: The generated wiki table as a string.
         """
+        with tracing.span("WikiTemplate.build", "render"):
+            return self._build()
+
+    def _build(self) -> str:
         output = []
         output.append(self.generate_header())
 
@@ -362,11 +385,18 @@ class ManualWikiTemplate:
         self.title = title
         self.categories = categories
         self.collapsible = collapsible
+        # Computed once per template; every row needs the depth and every category its leaf counts.
+        # The counts are keyed by id() of dicts inside `categories`, which stay alive with the template.
+        self._max_depth = None
+        self._leaf_counts = {}
+        self._max_leaves = {}
 
     def get_max_category_depth(self) -> int:
         """Returns the maximum depth of nested subcategories"""
         if not self.categories:
             return 0
+        if self._max_depth is not None:
+            return self._max_depth
 
         def get_depth(d: dict) -> int:
             if not isinstance(d, dict):
@@ -375,7 +405,8 @@ class ManualWikiTemplate:
                 return 1
             return 1 + max(get_depth(v) for v in d.values())
 
-        return get_depth(self.categories)
+        self._max_depth = get_depth(self.categories)
+        return self._max_depth
 
     def get_current_max_subcategories(self, data: dict) -> int:
         """Returns the maximum number of leaf nodes under any category"""
@@ -390,7 +421,14 @@ class ManualWikiTemplate:
                 return 1
             # Filter out metadata and options
             filtered_dict = {k: v for k, v in d.items() if k not in ["__metadata", "__options"]}
-            return sum(count_leaves(v) for v in filtered_dict.values())
+            return sum(count_child_leaves(v) for v in filtered_dict.values())
+
+        def count_child_leaves(d) -> int:
+            if not isinstance(d, dict):
+                return 1
+            if id(d) not in self._leaf_counts:
+                self._leaf_counts[id(d)] = count_leaves(d)
+            return self._leaf_counts[id(d)]
 
         def get_max_at_level(d: dict) -> int:
             if not isinstance(d, dict):
@@ -407,10 +445,15 @@ class ManualWikiTemplate:
             current = count_leaves(filtered_dict)
 
             # Recursively get max from children
-            child_maxes = [get_max_at_level(v) for v in filtered_dict.values() if isinstance(v, dict)]
+            child_maxes = [get_child_max(v) for v in filtered_dict.values() if isinstance(v, dict)]
 
             return max([current] + child_maxes)
 
+        def get_child_max(d: dict) -> int:
+            if id(d) not in self._max_leaves:
+                self._max_leaves[id(d)] = get_max_at_level(d)
+            return self._max_leaves[id(d)]
+
         return get_max_at_level(data)
 
     def get_category_options(self, category_data):
@@ -480,6 +523,10 @@ class ManualWikiTemplate:
         return "|}"
 
     def build(self) -> str:
+        with tracing.span("ManualWikiTemplate.build", "render"):
+            return self._build()
+
+    def _build(self) -> str:
         output = []
         output.append(self.generate_header())
 
@@ -0,0 +1,102 @@
+import json
+import random
+
+import pytest
+
+# visual.py needs the preview's web engine, whose libraries headless machines often lack
+pytest.importorskip("PyQt6.QtWebEngineWidgets", exc_type=ImportError)
+
+from save_store import apply_record  # noqa: E402
+from tree_model import DocumentNode, TreeModel  # noqa: E402
+from visual import TreeCommand  # noqa: E402
+
+
+def round_trip(value):
+    # Records reach the journal as JSON
+    return json.loads(json.dumps(value))
+
+
+def list_data(model):
+    return round_trip({node.name: node.to_dict() for node in model.root.children})
+
+
+def all_nodes(model):
+    nodes = []
+    pending = list(model.root.children)
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(node.children)
+    return nodes
+
+
+def random_command(rnd, model, step):
+    nodes = all_nodes(model)
+    kind = rnd.choice(["add", "add", "remove", "modify", "move"]) if nodes else "add"
+    if kind == "add":
+        # Shared names make records find their entries by row
+        node = DocumentNode(rnd.choice(["New Item", f"Item {step}"]), rnd.choice(["category", "item"]), "")
+        parent = rnd.choice(nodes) if nodes and rnd.random() < 0.8 else model.root
+        return TreeCommand("Add", model, "add", node, parent)
+    node = rnd.choice(nodes)
+    if kind == "remove":
+        return TreeCommand("Remove", model, "remove", node, node.parent)
+    if kind == "modify":
+        return TreeCommand(
+            "Modify",
+            model,
+            "modify",
+            node,
+            old_data={"text": node.name, "description": node.description},
+            new_data={"text": rnd.choice([node.name, f"Renamed {step}", "New Item"]), "description": f"{step}"},
+        )
+    return TreeCommand(
+        "Move",
+        model,
+        "move",
+        node,
+        old_data={"index": node.row()},
+        new_data={"index": rnd.randrange(len(node.parent.children))},
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_journal_replays_commands_undo_and_redo(seed):
+    rnd = random.Random(seed)
+    model = TreeModel()
+    data = {}
+    undo_stack, redo_stack = [], []
+    for step in range(300):
+        roll = rnd.random()
+        if roll < 0.1 and undo_stack:
+            if rnd.random() < 0.2:
+                # Commands spilled to the undo log come back from their records
+                undo_stack = [
+                    entry if isinstance(entry, dict) else round_trip(entry.to_record()) for entry in undo_stack
+                ]
+            command = undo_stack.pop()
+            if isinstance(command, dict):
+                command = TreeCommand.from_record(model, command)
+            command.undo()
+            redo_stack.append(command)
+            record = command.journal_record(undone=True)
+        elif roll < 0.15 and redo_stack:
+            command = redo_stack.pop()
+            command.do()
+            command.locate()
+            undo_stack.append(command)
+            record = command.journal_record()
+        else:
+            command = random_command(rnd, model, step)
+            command.do()
+            command.locate()
+            undo_stack.append(command)
+            redo_stack.clear()
+            record = command.journal_record()
+
+        if record is None:
+            # The editor takes a snapshot of changes a record cannot describe
+            data = list_data(model)
+        else:
+            apply_record(data, round_trip(record))
+        assert json.dumps(data) == json.dumps(list_data(model)), (step, record)
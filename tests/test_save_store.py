@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from save_store import JournalJob, SaveJob, encode_save, journal_path, load_save, write_atomic
+
+TITLE = {"op": "set", "key": "__title", "value": "Renamed"}
+
+
+def category(**children):
+    return {"__metadata": {"type": "category"}, **children}
+
+
+@pytest.fixture
+def save_path(tmp_path):
+    path = str(tmp_path / "list.json.gz")
+    SaveJob(path, {"__title": "List", "Fruit": category()}).run()
+    return path
+
+
+def test_stale_journal_needs_a_snapshot(save_path):
+    # A crash after writing a snapshot but before its journal leaves the journal of the one before
+    write_atomic(save_path, encode_save({"__title": "List", "Fruit": category(), "Vegetables": category()}))
+    JournalJob(save_path, [TITLE]).run()
+
+    data, replayed, _, journal_current = load_save(save_path)
+    assert replayed == 0
+    assert not journal_current
+    assert data["__title"] == "List"
+
+    # The snapshot load_from_save asks for starts a journal that new records are replayed from
+    SaveJob(save_path, data).run()
+    JournalJob(save_path, [TITLE]).run()
+    data, replayed, _, journal_current = load_save(save_path)
+    assert (replayed, journal_current, data["__title"]) == (1, True, "Renamed")
+
+
+def test_unmatched_record_needs_a_snapshot(save_path):
+    JournalJob(save_path, [{"op": "remove", "path": [], "name": "Missing"}, TITLE]).run()
+
+    data, replayed, _, journal_current = load_save(save_path)
+    assert replayed == 0
+    assert not journal_current
+    assert data["__title"] == "List"
+
+
+def test_missing_journal_needs_a_snapshot(save_path):
+    os.remove(journal_path(save_path))
+
+    data, replayed, _, journal_current = load_save(save_path)
+    assert (replayed, journal_current) == (0, False)
+    assert "Fruit" in data
+
+
+def test_cut_off_record_is_dropped(save_path):
+    JournalJob(save_path, [{"op": "insert", "path": ["Fruit"], "index": 0, "name": "Apple", "value": category()}]).run()
+    # A crash while appending the next record leaves a line without its newline
+    with open(journal_path(save_path), "ab") as f:
+        f.write(b'{"op": "set", "key": "__ti')
+
+    data, replayed, _, journal_current = load_save(save_path)
+    assert (replayed, journal_current) == (1, True)
+    assert list(data["Fruit"]) == ["__metadata", "Apple"]
+
+    JournalJob(save_path, [TITLE]).run()
+    data, replayed, _, journal_current = load_save(save_path)
+    assert (replayed, journal_current, data["__title"]) == (2, True, "Renamed")
+
+
+def test_complete_record_without_newline_is_not_replayed(save_path):
+    # JournalJob cuts the line off before appending, so replaying it would lose it on the next load
+    with open(journal_path(save_path), "ab") as f:
+        f.write(b'{"op": "set", "key": "__title", "value": "Lost"}')
+
+    data, replayed, _, _ = load_save(save_path)
+    assert (replayed, data["__title"]) == (0, "List")
+
+
+def test_compaction_starts_an_empty_journal(save_path):
+    JournalJob(save_path, [TITLE, {"op": "insert", "path": [], "index": 1, "name": "Nuts", "value": category()}]).run()
+    data, replayed, _, _ = load_save(save_path)
+    assert replayed == 2
+
+    SaveJob(save_path, data).run()
+    with open(journal_path(save_path), "rb") as f:
+        assert f.read().count(b"\n") == 1  # Only the header
+
+    compacted, replayed, _, journal_current = load_save(save_path)
+    assert (replayed, journal_current) == (0, True)
+    assert compacted == data
+    assert list(compacted) == ["__title", "Fruit", "Nuts"]